@@ -0,0 +1,106 @@
+"""
+Benchmark da clusterização: varredura linear (antiga) x índice invertido
+(cluster_bubbles_keywords) x TF-IDF vetorizado (cluster_bubbles_tfidf, se numpy/scipy existirem).
+
+Gera títulos sintéticos (vocabulário com distribuição Zipf), confere que os dois
+algoritmos por keywords produzem exatamente os mesmos clusters e mede o tempo de 100 a 100k títulos.
+Para o TF-IDF mostra também o maior grupo (encadeamento de títulos num grupo gigante).
+
+Uso:
+    python bench_clustering.py
+    python bench_clustering.py --sizes 100 1000 10000 --legacy-max 10000
+"""
+
+import argparse
+import itertools
+import random
+import time
+from typing import List, Optional
+
+import bubbles_engine as be
+
+
+def cluster_bubbles_legacy(items: List[be.BubbleItem]) -> List[be.BubbleCluster]:
+    # implementação anterior (O(posts × clusters)), mantida só como referência
+    clusters: List[be.BubbleCluster] = []
+    for it in items:
+        kws = set(be.extract_keywords(it.title))
+        matched: Optional[be.BubbleCluster] = None
+        for c in clusters:
+            ckws = set(c.key.split("|")) if c.key else set()
+            if len(kws & ckws) >= be.CLUSTER_MIN_OVERLAP:
+                matched = c
+                break
+        if matched:
+            matched.items.append(it)
+        else:
+            clusters.append(be.BubbleCluster(key=be.cluster_key_from_title(it.title), items=[it]))
+    for c in clusters:
+        c.rawScore = max(x.rawScore for x in c.items)
+    return clusters
+
+
+def synthetic_items(n: int, seed: int = 42) -> List[be.BubbleItem]:
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab_size = max(500, n * 3)
+    vocab = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(vocab_size)]
+    # acumulado uma vez: choices(weights=...) refaz a soma a cada título (O(vocab) por título)
+    cum_weights = list(itertools.accumulate(1.0 / (i + 1) ** 1.1 for i in range(vocab_size)))
+
+    items: List[be.BubbleItem] = []
+    for i in range(n):
+        words = rng.choices(vocab, cum_weights=cum_weights, k=rng.randint(6, 12))
+        items.append(
+            be.BubbleItem(
+                id=f"reddit_{i}",
+                title=" ".join(words).capitalize(),
+                source="reddit",
+                subreddit="bench",
+                permalink=f"https://example.invalid/{i}",
+                createdAt="",
+                rawScore=rng.random() * 1000,
+            )
+        )
+    return items
+
+
+def signature(clusters: List[be.BubbleCluster]) -> List[tuple]:
+    return [(c.key, tuple(it.id for it in c.items), c.rawScore) for c in clusters]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000, 100000])
+    ap.add_argument("--legacy-max", type=int, default=20000, help="acima disso não roda a versão linear")
+    args = ap.parse_args()
+
+    print(f"{'títulos':>9} {'clusters':>9} {'índice (s)':>11} {'linear (s)':>11} {'speedup':>8}  iguais  {'tfidf (s)':>10} {'clusters':>9} {'maior':>6}")
+    for n in args.sizes:
+        items = synthetic_items(n)
+
+        t0 = time.perf_counter()
+        fast = be.cluster_bubbles_keywords(items)
+        t_fast = time.perf_counter() - t0
+
+        tfidf = "-"
+        if be.tfidf_clustering.AVAILABLE:
+            fresh = synthetic_items(n)  # gerado fora do tempo medido
+            t0 = time.perf_counter()
+            vec = be.cluster_bubbles_tfidf(fresh)
+            t_vec = time.perf_counter() - t0
+            tfidf = f"{t_vec:>10.3f} {len(vec):>9} {max(len(c.items) for c in vec):>6}"
+
+        if n <= args.legacy_max:
+            fresh = synthetic_items(n)
+            t0 = time.perf_counter()
+            slow = cluster_bubbles_legacy(fresh)
+            t_slow = time.perf_counter() - t0
+            same = "sim" if signature(fast) == signature(slow) else "NÃO"
+            print(f"{n:>9} {len(fast):>9} {t_fast:>11.3f} {t_slow:>11.3f} {t_slow / t_fast:>7.1f}x  {same:>6}  {tfidf}")
+        else:
+            print(f"{n:>9} {len(fast):>9} {t_fast:>11.3f} {'-':>11} {'-':>8}  {'-':>6}  {tfidf}")
+
+
+if __name__ == "__main__":
+    main()
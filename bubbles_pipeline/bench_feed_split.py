@@ -0,0 +1,73 @@
+"""
+Benchmark do payload da home: feed completo x índice leve (write_feed_shards).
+
+Monta feeds de TOP_N bolhas repetindo os itens do bubbles_enriched.json do repo
+(ids trocados), grava os shards num diretório temporário e compara, para cada
+TOP_N, o tamanho e o tempo de parse (json.loads, mediana) do que a home precisa
+carregar: antes o feed inteiro, agora só index.json.
+
+Uso:
+    python bench_feed_split.py
+    python bench_feed_split.py --top-n 20 100 500 2000 --feed bubbles_enriched.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from feed_artifacts import SHARDS_INDEX, dumps, write_feed_shards
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def feed_of(items: List[Dict[str, Any]], n: int) -> Dict[str, Any]:
+    out = []
+    for i in range(n):
+        it = dict(items[i % len(items)])
+        it["id"] = f"{it.get('id', 'bubble')}_{i}"
+        it["rank"] = i + 1
+        out.append(it)
+    return {"generatedAt": "bench", "count": n, "items": out}
+
+
+def parse_ms(raw: bytes, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        json.loads(raw)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Feed completo x índice leve")
+    ap.add_argument("--feed", default=os.path.join(HERE, "bubbles_enriched.json"))
+    ap.add_argument("--top-n", type=int, nargs="+", default=[20, 100, 500, 2000])
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    with open(args.feed, "r", encoding="utf-8") as f:
+        items = json.load(f)["items"]
+
+    print(f"{'TOP_N':>6} {'feed (KB)':>10} {'índice (KB)':>12} {'redução':>8}  {'parse feed':>11} {'parse índice':>13}")
+    for n in args.top_n:
+        doc = feed_of(items, n)
+        full = dumps(doc)
+        with tempfile.TemporaryDirectory() as tmp:
+            write_feed_shards(doc, tmp)
+            with open(os.path.join(tmp, SHARDS_INDEX), "rb") as f:
+                index = f.read()
+        t_full = parse_ms(full, args.repeat)
+        t_index = parse_ms(index, args.repeat)
+        print(
+            f"{n:>6} {len(full) / 1024:>10.1f} {len(index) / 1024:>12.1f} {1 - len(index) / len(full):>8.0%}  "
+            f"{t_full:>9.2f}ms {t_index:>11.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark de memória dos modelos de post: bytes por post antes x depois.
+
+Gera páginas de listagem com o fake do Reddit (mesmo formato da API), decodifica o
+JSON de cada página e monta, para cada representação, a coleção inteira de posts:
+
+  - dataclass:  RedditPost/BubbleItem como eram (dataclass com __dict__ por instância)
+  - slots:      RedditPost/BubbleItem atuais (dataclass(slots=True))
+  - PostBatch:  colunas (arrays paralelos, subreddits internados, imagens esparsas)
+
+A memória retida (tracemalloc) inclui as strings de cada post (títulos, ids,
+permalinks), como na coleta real, e é dividida pelo número de posts.
+
+Uso:
+    python bench_memory.py
+    python bench_memory.py --sizes 10000 100000 --posts-per-sub 100
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import bubbles_engine as be
+from fake_reddit_server import FakeRedditConfig, listing
+
+
+@dataclass
+class LegacyRedditPost:
+    # definição anterior (sem slots), mantida só como referência
+    id: str
+    subreddit: str
+    title: str
+    score: int
+    num_comments: int
+    created_utc: float
+    permalink: str
+    image: Optional[str] = None
+
+
+@dataclass
+class LegacyBubbleItem:
+    id: str
+    title: str
+    source: str
+    subreddit: str
+    permalink: str
+    createdAt: str
+    rawScore: float
+    relevanceScore: float = 0.0
+    suggestedRadius: float = 0.0
+    rank: int = 0
+    label: str = ""
+    context: str = ""
+    opinions: Optional[List[Dict[str, Any]]] = None
+    image: Optional[str] = None
+
+
+def listing_pages(n: int, posts_per_sub: int) -> List[str]:
+    """JSON cru de cada página (o parse acontece dentro da medição, como no fetch)."""
+    cfg = FakeRedditConfig(total_posts=n, posts_per_sub=posts_per_sub)
+    return [json.dumps(listing(cfg, sub, posts_per_sub)) for sub in cfg.subreddits]
+
+
+def children(page: str):
+    for c in json.loads(page)["data"]["children"]:
+        yield c["data"]
+
+
+def build_posts(pages: List[str], cls) -> List[Any]:
+    return [
+        cls(
+            id=d["id"],
+            subreddit=d["subreddit"],
+            title=be.safe_text(d["title"]),
+            score=int(d["score"]),
+            num_comments=int(d["num_comments"]),
+            created_utc=float(d["created_utc"]),
+            permalink=f"{be.REDDIT_BASE}{d['permalink']}",
+            image=be.extract_image_from_post(d),
+        )
+        for page in pages
+        for d in children(page)
+    ]
+
+
+def build_batch(pages: List[str]) -> be.PostBatch:
+    batch = be.PostBatch(be.REDDIT_BASE)
+    for page in pages:
+        for d in children(page):
+            batch.append(
+                id=d["id"],
+                subreddit=d["subreddit"],
+                title=be.safe_text(d["title"]),
+                score=int(d["score"]),
+                num_comments=int(d["num_comments"]),
+                created_utc=float(d["created_utc"]),
+                path=d["permalink"],
+                image=be.extract_image_from_post(d),
+            )
+    return batch
+
+
+def build_bubbles(pages: List[str], cls) -> List[Any]:
+    out = []
+    for p in build_posts(pages, be.RedditPost):
+        out.append(
+            cls(
+                id=f"reddit_{p.id}",
+                title=p.title,
+                source="reddit",
+                subreddit=p.subreddit,
+                permalink=p.permalink,
+                createdAt=datetime.fromtimestamp(p.created_utc, tz=timezone.utc).isoformat(),
+                rawScore=be.compute_raw_score(p.score, p.num_comments, p.created_utc),
+                image=p.image,
+            )
+        )
+    return out
+
+
+def retained_bytes(build: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        obj = build()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del obj
+    return current
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Memória por post: dataclass x slots x colunas")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--posts-per-sub", type=int, default=100)
+    args = ap.parse_args()
+
+    cases = [
+        ("RedditPost dataclass", lambda pages: build_posts(pages, LegacyRedditPost)),
+        ("RedditPost slots", lambda pages: build_posts(pages, be.RedditPost)),
+        ("PostBatch colunas", build_batch),
+        ("BubbleItem dataclass", lambda pages: build_bubbles(pages, LegacyBubbleItem)),
+        ("BubbleItem slots", lambda pages: build_bubbles(pages, be.BubbleItem)),
+    ]
+    print(f"{'posts':>7}  {'representação':<22} {'total (MB)':>10} {'bytes/post':>11}")
+    for n in args.sizes:
+        pages = listing_pages(n, args.posts_per_sub)
+        for name, build in cases:
+            total = retained_bytes(lambda: build(pages))
+            print(f"{n:>7}  {name:<22} {total / 1e6:>10.1f} {total / n:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark do índice de quase-duplicatas (NearDuplicateIndex.add_if_new).
+
+Dois corpora sintéticos:
+  - distintos:  títulos com palavras sorteadas (Zipf), quase nenhum bucket compartilhado;
+  - template:   títulos de megathread (um prefixo longo fixo por assunto) com quatro
+                palavras aleatórias no fim, mais ~10% de reposts com uma palavra trocada.
+                Os títulos distintos ficam logo abaixo do limiar, mas colidem nas mesmas
+                bandas: é o caso em que buckets sem limite deixam cada inserção linear
+                no corpus.
+
+Para cada tamanho mede o tempo total das inserções, o maior bucket e quantas
+duplicatas foram descartadas. Até --unbounded-max, repete com o índice sem limite de
+bucket/candidatos e a inserção antiga (query_signature varre todos os candidatos).
+
+Uso:
+    python bench_near_dupes.py
+    python bench_near_dupes.py --sizes 2000 8000 32000 --unbounded-max 4000
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+from near_dupes import NearDuplicateIndex
+
+STORIES = [
+    "Live thread: the ongoing negotiations over the national budget and the pension reform in parliament",
+    "Megathread: wildfire season updates, evacuation orders and air quality alerts across the region",
+    "Daily discussion: central bank interest rate decision, inflation figures and market reaction",
+]
+
+
+def distinct_titles(n: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(max(500, n * 3))]
+    weights = [1.0 / (i + 1) ** 1.1 for i in range(len(vocab))]
+    return [" ".join(rng.choices(vocab, weights=weights, k=rng.randint(6, 12))) for _ in range(n)]
+
+
+def word(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 7)))
+
+
+def template_titles(n: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    out: List[str] = []
+    for _ in range(n):
+        if out and rng.random() < 0.1:
+            words = rng.choice(out).split()
+            words[rng.randrange(len(words))] = word(rng)  # repost editado
+            out.append(" ".join(words))
+            continue
+        out.append(f"{rng.choice(STORIES)}, {' '.join(word(rng) for _ in range(4))}")
+    return out
+
+
+def add_legacy(index: NearDuplicateIndex, key: int, text: str) -> bool:
+    # inserção anterior: procura a quase-duplicata mais antiga entre todos os candidatos
+    sig = index.signature(text)
+    if sig is None:
+        return True
+    if index.query_signature(sig) is not None:
+        return False
+    index.insert_signature(key, sig)
+    return True
+
+
+def run(titles: List[str], index: NearDuplicateIndex, legacy: bool = False):
+    add = (lambda i, t: add_legacy(index, i, t)) if legacy else index.add_if_new
+    t0 = time.perf_counter()
+    dropped = sum(1 for i, t in enumerate(titles) if not add(i, t))
+    elapsed = time.perf_counter() - t0
+    return elapsed, dropped, index.largest_bucket()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="NearDuplicateIndex: inserções com títulos distintos e por template")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[2000, 4000, 8000, 16000, 32000])
+    ap.add_argument("--unbounded-max", type=int, default=4000, help="maior tamanho medido sem limites (lento)")
+    ap.add_argument("--threshold", type=float, default=0.8)
+    args = ap.parse_args()
+
+    print(f"{'corpus':>9} {'títulos':>8} {'tempo (s)':>10} {'µs/ins.':>8} {'maior bucket':>13} {'descartes':>10}  {'sem limite (s)':>15} {'descartes':>10}")
+    for name, gen in (("distintos", distinct_titles), ("template", template_titles)):
+        for n in args.sizes:
+            titles = gen(n)
+            elapsed, dropped, largest = run(titles, NearDuplicateIndex(args.threshold))
+            legacy = ""
+            if n <= args.unbounded_max:
+                unbounded = NearDuplicateIndex(args.threshold, max_bucket=None, max_candidates=None)
+                u_elapsed, u_dropped, _ = run(titles, unbounded, legacy=True)
+                legacy = f"{u_elapsed:>15.2f} {u_dropped:>10}"
+            print(
+                f"{name:>9} {n:>8} {elapsed:>10.2f} {elapsed / n * 1e6:>8.0f} {largest:>13} {dropped:>10}  {legacy}"
+            )
+
+
+if __name__ == "__main__":
+    main()
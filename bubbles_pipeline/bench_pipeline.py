@@ -0,0 +1,145 @@
+"""
+Benchmark offline de ponta a ponta (sem Reddit nem OpenAI reais).
+
+Sobe o fake do Reddit (listagens das fixtures + corpus sintético) e o fake da OpenAI,
+aponta o engine para eles e roda as mesmas etapas do run_pipeline: collect_bubbles →
+rank_clusters → enrich_and_write, com a configuração de produção (ranking em
+streaming, cache do LLM, stream NDJSON, feed/shards/delta). Cada tamanho roda num
+subprocesso próprio, num diretório temporário novo: o pico de memória (maxrss) é só
+daquele tamanho e os caches (LLM, HTTP) e o estado incremental começam vazios.
+Reporta tempo de parede por etapa (spans do Metrics), throughput (posts/s) e memória.
+
+As fixtures de comentários são sintéticas: os textos vêm dos contextos e opiniões
+gerados no bubbles_enriched.json do repo, não de threads gravadas do Reddit (use
+`fake_reddit_server.py --record <subreddit>` para gravar threads reais).
+
+Uso:
+    python bench_pipeline.py
+    python bench_pipeline.py --sizes 100 1000 --reddit-latency 0.02 --llm-latency 0.5
+    python bench_pipeline.py --json resultados.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_one(n: int, args: argparse.Namespace) -> Dict[str, Any]:
+    from fake_openai_server import FakeOpenAIConfig, start_fake_openai
+    from fake_reddit_server import FakeRedditConfig, start_fake_reddit
+
+    reddit_cfg = FakeRedditConfig(fixtures_dir=args.fixtures, total_posts=n, latency=args.reddit_latency)
+    _, reddit_url = start_fake_reddit(reddit_cfg)
+    llm_cfg = FakeOpenAIConfig(latency=args.llm_latency, jitter=args.llm_latency * 0.2)
+    _, llm_url = start_fake_openai(llm_cfg)
+
+    # client e caches leem ambiente/diretório na criação (primeiro uso): ajusta antes
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = llm_url
+    os.chdir(tempfile.mkdtemp(prefix="bubbles_bench_"))
+    import bubbles_engine as be
+
+    be.OPENAI_API_KEY = "bench"
+
+    be.REDDIT_BASE = reddit_url
+    be.SUBREDDITS = reddit_cfg.subreddits
+    be.FETCH_RATE_PER_SEC = args.rate
+    be.FETCH_BURST = args.rate
+    be.COMMENTS_RATE_PER_SEC = args.rate
+    be.SLEEP_BETWEEN_POSTS_COMMENTS = 0.0
+    # cache do LLM ligado, num arquivo novo (diretório temporário): começa vazio
+    be.LLM_CACHE_FILE = os.path.abspath(be.LLM_CACHE_FILE)
+    if os.path.exists(be.LLM_CACHE_FILE):
+        os.remove(be.LLM_CACHE_FILE)
+
+    be.metrics.reset()
+    t_start = time.perf_counter()
+    bubbles = be.collect_bubbles()
+    top = be.rank_clusters(bubbles) if bubbles else []
+    if top:
+        be.enrich_and_write(top)
+    wall = time.perf_counter() - t_start
+
+    with open(be.OUTPUT_FILE, "r", encoding="utf-8") as f:
+        feed = json.load(f)["items"] if top else []
+    stages = {k: round(v, 4) for k, v in be.metrics.summary()["stages"].items()}
+    cache = be.llm_cache
+    maxrss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        maxrss_kb //= 1024  # macOS reporta em bytes
+    return {
+        "posts": n,
+        "candidates": len(bubbles),
+        "clusters": len(top),
+        "enriched": sum(1 for it in feed if it.get("label")),
+        "wallSeconds": round(wall, 4),
+        "postsPerSecond": round(n / wall, 1) if wall > 0 else 0.0,
+        "maxRssMB": round(maxrss_kb / 1024, 1),
+        "stages": stages,
+        "redditRequests": reddit_cfg.requests,
+        "llmRequests": llm_cfg.requests,
+        "llmCacheMisses": cache.misses if cache is not None else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark offline do pipeline")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    ap.add_argument("--fixtures", default=os.path.join(HERE, "fixtures"))
+    ap.add_argument("--reddit-latency", type=float, default=0.0, help="s por requisição ao fake do Reddit")
+    ap.add_argument("--llm-latency", type=float, default=0.3, help="s por chamada ao fake da OpenAI")
+    ap.add_argument("--rate", type=float, default=1e6, help="token bucket das requisições ao Reddit (req/s)")
+    ap.add_argument("--json", help="grava os resultados neste arquivo")
+    ap.add_argument("--one", type=int, help=argparse.SUPPRESS)  # uso interno: roda um tamanho e imprime JSON
+    args = ap.parse_args()
+
+    if args.one is not None:
+        print("RESULT " + json.dumps(run_one(args.one, args)))
+        return
+
+    passthrough = [
+        "--fixtures", args.fixtures,
+        "--reddit-latency", str(args.reddit_latency),
+        "--llm-latency", str(args.llm_latency),
+        "--rate", str(args.rate),
+    ]
+    results: List[Dict[str, Any]] = []
+    print(
+        f"{'posts':>7} {'clusters':>9} {'enriq.':>7} {'total (s)':>10} {'posts/s':>9} {'RSS (MB)':>9}  "
+        f"{'fetch':>7} {'dedupe':>7} {'cluster':>8} {'coment.':>8} {'llm':>7} {'output':>7}"
+    )
+    for n in args.sizes:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--one", str(n), *passthrough],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+        )
+        line = next((l for l in proc.stdout.splitlines() if l.startswith("RESULT ")), None)
+        if proc.returncode != 0 or line is None:
+            print(f"{n:>7}  falhou:\n{proc.stderr.strip()[-2000:]}")
+            continue
+        r = json.loads(line[len("RESULT "):])
+        results.append(r)
+        st = r["stages"]
+        print(
+            f"{n:>7} {r['clusters']:>9} {r['enriched']:>7} {r['wallSeconds']:>10.2f} {r['postsPerSecond']:>9.0f} "
+            f"{r['maxRssMB']:>9.1f}  {st.get('fetch', 0):>7.2f} {st.get('dedupe', 0):>7.2f} {st.get('cluster', 0):>8.2f} "
+            f"{st.get('comments', 0):>8.2f} {st.get('llm', 0):>7.2f} {st.get('output', 0):>7.2f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark do scoring: funções escalares post a post x lote vetorizado (NumPy).
+
+Gera N posts sintéticos (score, num_comments, created_utc em array.array, como as
+colunas do PostBatch) e calcula rawScore → normalização min/max → suggestedRadius:
+
+  - escalar:  compute_raw_score / scale_score / suggested_radius, um post por vez
+  - lote:     score_batch (compute_raw_scores → normalize_scores_array → suggested_radii)
+
+Os dois usam o mesmo timestamp de referência; confere a diferença máxima entre eles.
+
+Uso:
+    python bench_scoring.py
+    python bench_scoring.py --sizes 1000 100000 1000000
+"""
+
+import argparse
+import random
+import time
+from array import array
+from typing import Tuple
+
+import bubbles_engine as be
+
+
+def synthetic_columns(n: int, now: float, seed: int = 42) -> Tuple[array, array, array]:
+    rng = random.Random(seed)
+    score = array("q", (rng.randint(0, 60000) for _ in range(n)))
+    num_comments = array("q", (rng.randint(0, 8000) for _ in range(n)))
+    created_utc = array("d", (now - rng.uniform(0, 48 * 3600) for _ in range(n)))
+    return score, num_comments, created_utc
+
+
+def score_scalar(score: array, num_comments: array, created_utc: array, now: float):
+    raw = [be.compute_raw_score(s, c, t, now) for s, c, t in zip(score, num_comments, created_utc)]
+    mn, mx = min(raw), max(raw)
+    relevance = [be.scale_score(r, mn, mx) for r in raw]
+    radius = [be.suggested_radius(r) for r in relevance]
+    return raw, relevance, radius
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Scoring escalar x vetorizado")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    args = ap.parse_args()
+
+    if not be.NUMPY_AVAILABLE:
+        print("numpy não instalado: só o caminho escalar está disponível")
+        return
+
+    import numpy as np
+
+    print(f"{'posts':>8} {'escalar (s)':>12} {'lote (s)':>10} {'speedup':>8}  {'Δraw rel.':>10} {'Δrelev.':>9} {'Δraio':>6}")
+    for n in args.sizes:
+        now = time.time()
+        cols = synthetic_columns(n, now)
+
+        t0 = time.perf_counter()
+        raw_s, rel_s, rad_s = score_scalar(*cols, now)
+        t_scalar = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        raw_v, rel_v, rad_v = be.score_batch(*cols, now=now)
+        t_batch = time.perf_counter() - t0
+
+        raw_s_arr = np.asarray(raw_s)
+        d_raw = float(np.max(np.abs(raw_v - raw_s_arr) / np.maximum(1.0, np.abs(raw_s_arr))))
+        d_rel = float(np.max(np.abs(rel_v - np.asarray(rel_s))))
+        d_rad = float(np.max(np.abs(rad_v - np.asarray(rad_s))))
+        print(
+            f"{n:>8} {t_scalar:>12.3f} {t_batch:>10.4f} {t_scalar / max(t_batch, 1e-9):>7.0f}x  "
+            f"{d_raw:>10.1e} {d_rel:>9.1e} {d_rad:>6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+CLI do pipeline em etapas. Cada subcomando carrega só o que usa:
+`cluster` não importa requests/openai, `publish` nem importa o engine.
+
+Uso:
+    python bubbles_cli.py fetch --out posts.json        # Reddit → posts (dedupe + scores)
+    python bubbles_cli.py cluster --in posts.json --out clusters.json
+    python bubbles_cli.py enrich --in clusters.json     # LLM → bubbles_enriched.json
+    python bubbles_cli.py recover                       # feed a partir do NDJSON de uma execução interrompida
+    python bubbles_cli.py publish --to ../assets/data/bubbles_enriched.json
+    python bubbles_cli.py publish --artifacts-dir ../build/web/data     # .json/.gz/.br com hash + manifest
+    python bubbles_cli.py publish --to ../assets/data/bubbles_enriched.json --shards bubbles_feed
+    python bubbles_cli.py run                           # tudo (mesmo que bubbles_engine.py)
+"""
+
+import argparse
+import json
+from dataclasses import asdict
+from typing import Any, Dict, List
+
+DEFAULT_POSTS_FILE = "bubbles_posts.json"
+DEFAULT_CLUSTERS_FILE = "bubbles_clusters.json"
+DEFAULT_FEED_FILE = "bubbles_enriched.json"  # mesmo OUTPUT_FILE do engine
+
+
+def _dump(path: str, payload: Any) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def _load(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def cmd_fetch(args: argparse.Namespace) -> int:
+    import bubbles_engine as be
+
+    try:
+        bubbles = be.collect_bubbles()
+    finally:
+        be.export_metrics()
+    _dump(args.out, [asdict(b) for b in bubbles])
+    print(f"💾 {len(bubbles)} posts em {args.out}")
+    return 0
+
+
+def cmd_cluster(args: argparse.Namespace) -> int:
+    import bubbles_engine as be
+
+    bubbles = [be.BubbleItem(**d) for d in _load(args.input)]
+    top = be.rank_clusters(bubbles)
+    payload: List[Dict[str, Any]] = [
+        {
+            "key": c.key,
+            "rawScore": c.rawScore,
+            "relevanceScore": c.relevanceScore,
+            "items": [asdict(it) for it in c.items],
+        }
+        for c in top
+    ]
+    _dump(args.out, payload)
+    print(f"💾 {len(top)} clusters em {args.out}")
+    return 0
+
+
+def cmd_enrich(args: argparse.Namespace) -> int:
+    import bubbles_engine as be
+
+    clusters = [
+        be.BubbleCluster(
+            key=d["key"],
+            items=[be.BubbleItem(**it) for it in d["items"]],
+            rawScore=d.get("rawScore", 0.0),
+            relevanceScore=d.get("relevanceScore", 0.0),
+        )
+        for d in _load(args.input)
+    ]
+    if not clusters:
+        print("Nenhum cluster para enriquecer.")
+        return 1
+    try:
+        be.enrich_and_write(clusters)
+    finally:
+        be.export_metrics()
+    return 0
+
+
+def cmd_recover(args: argparse.Namespace) -> int:
+    import bubbles_engine as be
+
+    doc = be.rebuild_feed_from_stream(args.input or be.STREAM_FILE)
+    return 0 if doc["count"] else 1
+
+
+def cmd_publish(args: argparse.Namespace) -> int:
+    from publish import publish_feed
+
+    if not args.to and not args.command and not args.artifacts_dir:
+        print("Nada a fazer: informe --to, --artifacts-dir e/ou --command.")
+        return 1
+    return 0 if publish_feed(args.src, args.to, args.command, args.artifacts_dir, args.shards, args.delta) else 1
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    import bubbles_engine as be
+
+    be.main()
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Pipeline do Bubbles em etapas")
+    sub = ap.add_subparsers(dest="command_name", required=True)
+
+    p = sub.add_parser("fetch", help="coleta posts do Reddit (dedupe + scores)")
+    p.add_argument("--out", default=DEFAULT_POSTS_FILE)
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("cluster", help="agrupa os posts e seleciona os TOP_N clusters")
+    p.add_argument("--in", dest="input", default=DEFAULT_POSTS_FILE)
+    p.add_argument("--out", default=DEFAULT_CLUSTERS_FILE)
+    p.set_defaults(func=cmd_cluster)
+
+    p = sub.add_parser("enrich", help="enriquece os clusters com o LLM e grava o feed")
+    p.add_argument("--in", dest="input", default=DEFAULT_CLUSTERS_FILE)
+    p.set_defaults(func=cmd_enrich)
+
+    p = sub.add_parser("recover", help="remonta o feed a partir do stream NDJSON do enrich")
+    p.add_argument("--in", dest="input", help="NDJSON das bolhas (padrão: STREAM_FILE do engine)")
+    p.set_defaults(func=cmd_recover)
+
+    p = sub.add_parser("publish", help="publica o feed gerado")
+    p.add_argument("--src", default=DEFAULT_FEED_FILE)
+    p.add_argument("--to", action="append", default=[], metavar="PATH", help="destino (repetível)")
+    p.add_argument("--artifacts-dir", help="grava JSON compacto + .gz/.br com hash no nome e o manifest")
+    p.add_argument("--shards", metavar="DIRNAME", help="grava índice + detalhes por bolha ao lado de cada destino")
+    p.add_argument("--delta", metavar="PATH", help="delta do feed (bubbles_delta.json) copiado ao lado de cada destino")
+    p.add_argument("--command", help="comando executado após a cópia")
+    p.set_defaults(func=cmd_publish)
+
+    p = sub.add_parser("run", help="pipeline completo")
+    p.set_defaults(func=cmd_run)
+
+    args = ap.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
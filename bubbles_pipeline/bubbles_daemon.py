@@ -0,0 +1,121 @@
+"""
+Modo daemon: mantém o engine carregado e atualiza o feed num intervalo fixo.
+
+O processo importa o engine uma vez, então a requests.Session (conexões keep-alive),
+o client da OpenAI, os caches (HTTP e LLM) e o estado incremental continuam vivos
+entre as execuções. Cada ciclo roda run_pipeline(), exporta as métricas do ciclo e
+publica o feed gerado (cópia atômica para os destinos, com índice + detalhes ao lado
+quando FEED_SHARDS, e o delta quando FEED_DELTA, e/ou comando externo).
+
+SIGTERM/SIGINT: termina o ciclo em andamento, salva o estado e fecha os caches.
+Um segundo sinal interrompe imediatamente.
+
+Uso:
+    python bubbles_daemon.py --interval 300 --publish ../assets/data/bubbles_enriched.json
+    python bubbles_daemon.py --once --publish-command "netlify deploy --prod"
+"""
+
+import argparse
+import os
+import signal
+import threading
+import time
+from typing import List, Optional
+
+import bubbles_engine as be
+from prompt_budget import PromptTokenStats
+from publish import publish_feed
+
+DEFAULT_INTERVAL_SECONDS = 300
+
+
+class FeedDaemon:
+    def __init__(
+        self,
+        interval: float,
+        publish_paths: List[str],
+        publish_command: Optional[str],
+        artifacts_dir: Optional[str] = None,
+    ):
+        self.interval = max(1.0, float(interval))
+        self.publish_paths = publish_paths
+        self.publish_command = publish_command
+        self.artifacts_dir = artifacts_dir
+        self.stop = threading.Event()
+        self.cycles = 0
+        self.failures = 0
+        # estado incremental carregado uma vez e mantido em memória entre os ciclos
+        self.state = be.open_state_store()
+
+    def handle_signal(self, signum: int, frame: object) -> None:
+        if self.stop.is_set():
+            raise KeyboardInterrupt
+        print(f"🛑 Sinal {signal.Signals(signum).name} recebido; encerrando após o ciclo atual")
+        self.stop.set()
+
+    def run_cycle(self) -> None:
+        self.cycles += 1
+        be.metrics.reset()
+        be.prompt_stats = PromptTokenStats()
+        be.structured_output_rejected = False
+        # caches persistem entre ciclos; só as estatísticas são por ciclo
+        if be.http_cache is not None:
+            be.http_cache.reset_stats()
+        if be.llm_cache is not None:
+            be.llm_cache.reset_stats()
+        if self.state is not None:
+            self.state.reused = self.state.regenerated = 0
+        print(f"🔁 Ciclo {self.cycles}")
+        try:
+            if be.run_pipeline(self.state):
+                publish_feed(
+                    be.OUTPUT_FILE,
+                    self.publish_paths,
+                    self.publish_command,
+                    self.artifacts_dir,
+                    os.path.basename(be.FEED_SHARDS_DIR) if be.FEED_SHARDS else None,
+                    be.FEED_DELTA_FILE if be.FEED_DELTA else None,
+                )
+        except Exception as e:
+            self.failures += 1
+            print(f"[WARN] Ciclo {self.cycles} falhou: {e}")
+        finally:
+            be.export_metrics()
+
+    def run(self, once: bool = False) -> None:
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+        try:
+            while not self.stop.is_set():
+                started = time.monotonic()
+                self.run_cycle()
+                if once:
+                    break
+                # intervalo conta do início do ciclo (taxa fixa, sem deriva)
+                self.stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            print("🛑 Interrompido")
+        finally:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        if self.state is not None:
+            self.state.save()
+        be.close_clients()
+        print(f"👋 Daemon encerrado: ciclos={self.cycles} falhas={self.failures}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Atualiza o feed do Bubbles periodicamente")
+    ap.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_SECONDS, help="s entre inícios de ciclo")
+    ap.add_argument("--publish", action="append", default=[], metavar="PATH", help="destino do feed (repetível)")
+    ap.add_argument("--artifacts-dir", help="grava JSON compacto + .gz/.br com hash no nome e o manifest")
+    ap.add_argument("--publish-command", help="comando executado após cada feed gerado")
+    ap.add_argument("--once", action="store_true", help="roda um ciclo e sai")
+    args = ap.parse_args()
+
+    FeedDaemon(args.interval, args.publish, args.publish_command, args.artifacts_dir).run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,38 @@
+import hashlib
 import json
 import math
 import os
 import re
+import threading
 import time
+from array import array
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
-from urllib.parse import quote
-
-import requests
-from openai import OpenAI
+from importlib.util import find_spec
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from urllib.parse import quote, urlparse
+
+from cluster_state import ClusterStateStore
+from feed_artifacts import dumps, write_atomic, write_feed_shards
+from feed_delta import FeedSnapshotStore, stats_line as delta_stats_line
+from metrics import Metrics
+from near_dupes import NearDuplicateIndex
+from prompt_budget import PromptTokenStats, TokenCounter
+from streaming_rank import StreamingTopK
+from structured_output import build_repair_messages, merge_repair, response_format, validate_enrichment
+import structured_output
+import tfidf_clustering
+
+# requests, openai e os caches em SQLite só são importados/criados no primeiro uso
+# (get_session / get_client / get_llm_cache): clusterizar ou testar não paga por eles
+if TYPE_CHECKING:
+    import numpy as np
+    import requests
+    from openai import OpenAI, RateLimitError
+
+    from http_cache import CachingHTTPAdapter
+    from llm_cache import LLMCache
 
 # =========================
 # CONFIG
@@ -23,8 +46,18 @@ TOP_N = 20
 
 USER_AGENT = "BubblesMVP/0.2 (contact: your_email_or_handle)"
 OUTPUT_FILE = "bubbles_enriched.json"
+STREAM_OUTPUT = True                  # grava cada bolha em NDJSON assim que termina de enriquecer
+STREAM_FILE = "bubbles_enriched.ndjson"
+FEED_COMPACT = True                   # JSON sem indentação (orjson se instalado); False mantém indent=2
+FEED_SHARDS = True                    # também grava índice leve (mapa da home) + um detalhe por bolha
+FEED_SHARDS_DIR = "bubbles_feed"      # <dir>/index.json e <dir>/details/<id>.json
+FEED_DELTA = True                     # grava o delta (por id) em relação ao último feed publicado
+FEED_DELTA_FILE = "bubbles_delta.json"
+FEED_SNAPSHOT_FILE = "bubbles_feed_snapshot.json"   # último feed publicado + versão
+FEED_DELTA_MAX_FRACTION = 0.5         # delta maior que esta fração do feed completo → snapshot completo
 
 MODEL = "gpt-4.1-mini"
+TEMPERATURE = 0.1
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 REDDIT_BASE = "https://www.reddit.com"
@@ -32,28 +65,187 @@ REDDIT_BASE = "https://www.reddit.com"
 MAX_COMMENTS_PER_POST = 40
 MIN_COMMENT_CHARS = 30
 
+# Orçamento de tokens do prompt (bloco de comentários preenchido por score até o limite)
+PROMPT_BUDGET_ENABLED = True          # False mantém o corte por caracteres (MAX_COMMENTS_PER_POST × 350)
+PROMPT_MAX_INPUT_TOKENS = 4000        # system + user (instruções, título e comentários)
+PROMPT_MAX_TOKENS_PER_COMMENT = 120   # cada comentário é truncado neste número de tokens
+
+# Saída estruturada (json_schema strict) e reparo dos campos inválidos
+STRUCTURED_OUTPUT = True              # False mantém o pedido de JSON só pelo prompt
+                                      # (desligado sozinho na execução se o endpoint recusar response_format)
+LLM_REPAIR_ENABLED = True             # reenvia só os campos inválidos (sem comentários) antes do placeholder
+LLM_REPAIR_MAX_TOKENS = 550           # teto de saída do pedido de reparo
+
 SLEEP_BETWEEN_SUBS = 1.0
 SLEEP_BETWEEN_POSTS_COMMENTS = 0.3
 
+# Coleta das listagens (hot.json)
+ASYNC_FETCH = True                    # False mantém o fluxo serial antigo (com SLEEP_BETWEEN_SUBS)
+FETCH_RATE_PER_SEC = 1.0              # taxa sustentada do token bucket (requisições/s)
+FETCH_BURST = 5                       # rajada máxima de requisições liberadas de uma vez
+FETCH_MAX_CONCURRENCY = 8             # requisições de listagem simultâneas
+LISTING_PAGE_SIZE = 100               # posts por página (máximo aceito pelo Reddit)
+LISTING_MAX_PAGES = 4                 # orçamento de páginas por subreddit (segue o cursor `after`)
+LISTING_STOP_ON_IRRELEVANT_PAGE = True  # para de paginar quando uma página não tem nenhum post relevante
+
+# Coleta de comentários dos clusters
+PARALLEL_COMMENTS = True              # False mantém o fluxo serial antigo (com SLEEP_BETWEEN_POSTS_COMMENTS)
+COMMENTS_MAX_WORKERS = 8              # threads do pool de comentários (todos os clusters)
+COMMENTS_MAX_PER_HOST = 4             # requisições simultâneas por host
+COMMENTS_RATE_PER_SEC = 3.0           # taxa sustentada (token bucket) das requisições de comentários
+
+# Enriquecimento (LLM) concorrente
+PARALLEL_LLM = True                   # False mantém as chamadas ao modelo uma a uma
+LLM_MAX_IN_FLIGHT = 8                 # teto de chamadas simultâneas ao modelo
+LLM_INITIAL_IN_FLIGHT = 4             # limite inicial (ajustado em AIMD durante a execução)
+LLM_AIMD_DECREASE = 0.5               # fator multiplicativo aplicado a cada 429
+LLM_MAX_RETRIES = 4                   # novas tentativas por cluster após 429
+LLM_BACKOFF_BASE = 1.0                # backoff (s) quando o 429 não traz Retry-After
+
+# Empacotamento: vários clusters por chamada (instruções enviadas 1x por pacote)
+PACK_SIZE = 1                         # clusters por chat completion (1 = uma chamada por cluster)
+PACK_MAX_TOKENS_PER_CLUSTER = 550     # orçamento de saída por cluster dentro do pacote
+
+# Modo lote (Batch API): todos os prompts num JSONL, um único job assíncrono (refresh agendado)
+BATCH_LLM = False                     # True troca as chamadas interativas pelo lote
+BATCH_INPUT_FILE = "llm_batch_input.jsonl"
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_INTERVAL = 30.0            # s entre consultas de status do lote
+BATCH_TIMEOUT_SECONDS = 24 * 3600     # desiste (cancela) e cai para chamadas interativas
+
+# Cache persistente das respostas do LLM (chave = hash de modelo + temperatura + prompts)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_FILE = "llm_cache.sqlite"
+LLM_CACHE_TTL_SECONDS = 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 5000
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Cache HTTP em disco para listagens e threads de comentários (ETag/Last-Modified)
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_FILE = "http_cache.sqlite"
+HTTP_CACHE_FRESH_LISTING = 60         # s sem revalidar hot.json
+HTTP_CACHE_FRESH_COMMENTS = 300       # s sem revalidar comments/<id>.json
+HTTP_CACHE_MAX_STALE = 2 * 24 * 3600  # entradas mais velhas são descartadas na abertura
+
+# Execução incremental: reaproveita o enriquecimento de clusters que não mudaram
+INCREMENTAL = True
+STATE_FILE = "bubbles_state.json"
+STATE_MIN_MEMBER_OVERLAP = 0.5        # Jaccard mínimo entre os posts membros (antes x agora)
+STATE_MIN_COMMENT_OVERLAP = 0.7       # Jaccard mínimo entre os ids dos comentários agregados
+STATE_MAX_AGE_SECONDS = 12 * 3600     # após isso, regenera mesmo sem mudanças
+
+# Quase-duplicatas (MinHash + LSH): reposts com título editado e comentários copiados
+NEAR_DUP_ENABLED = True               # False mantém só o dedupe exato (permalink / texto normalizado)
+NEAR_DUP_TITLE_THRESHOLD = 0.8        # Jaccard estimado mínimo entre títulos para descartar
+NEAR_DUP_COMMENT_THRESHOLD = 0.85     # idem para o texto dos comentários
+NEAR_DUP_NUM_PERM = 64                # tamanho da assinatura MinHash
+NEAR_DUP_SHINGLE_SIZE = 5             # shingles de caracteres
+
+# Ranking em streaming: os posts entram num heap limitado conforme são coletados
+STREAMING_RANK = True                 # False mantém lista completa → dedupe → normalização → sort
+RANK_MAX_CANDIDATES = 2000            # posts (maior rawScore) mantidos para clusterizar; min/max vê todos.
+                                      # Saída idêntica à passada completa só com até este número de posts
+
+# Scoring em lote (NumPy, opcional): um timestamp de referência por lote, sem loop por post
+VECTORIZED_SCORING = True             # False (ou sem numpy) mantém compute_raw_score post a post
+
 # Clusterização / agregação
+CLUSTER_ENGINE = "keywords"           # "keywords" (sobreposição de palavras) ou "tfidf" (cosseno vetorizado, requer numpy/scipy)
+CLUSTER_TFIDF_THRESHOLD = 0.35        # cosseno mínimo entre um título e o primeiro do grupo (líder)
+CLUSTER_TFIDF_BLOCK = 2048            # linhas por bloco no produto esparso
+CLUSTER_TFIDF_MAX_DF = 0.1            # termos em mais que essa fração dos títulos são ignorados
 CLUSTER_MIN_OVERLAP = 1               # número mínimo de keywords em comum para agrupar
 CLUSTER_MAX_POSTS_TO_MERGE = 4        # quantos posts por cluster usar para juntar comentários (cap)
 CLUSTER_MAX_TOTAL_COMMENTS = 60       # total máximo de candidatos de comentários (após merge)
 
+# Métricas da execução (spans por etapa e por chamada externa)
+METRICS_ENABLED = True
+METRICS_JSON_FILE = "bubbles_metrics.json"
+METRICS_PROM_FILE = "bubbles_metrics.prom"   # formato do textfile collector (node_exporter)
+
 # =========================
 # CLIENTS
 # =========================
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-session = requests.Session()
-session.headers.update({"User-Agent": USER_AGENT})
+metrics = Metrics()
+prompt_stats = PromptTokenStats()
+
+# criados sob demanda (None até o primeiro uso)
+client: Optional["OpenAI"] = None
+session: Optional["requests.Session"] = None
+http_cache: Optional["CachingHTTPAdapter"] = None
+llm_cache: Optional["LLMCache"] = None
+token_counter: Optional[TokenCounter] = None
+_clients_lock = threading.Lock()
+structured_output_rejected = False    # endpoint/modelo recusou response_format nesta execução
+
+def http_cache_freshness(url: str) -> float:
+    # janela de frescor por tipo de endpoint
+    return HTTP_CACHE_FRESH_COMMENTS if "/comments/" in url else HTTP_CACHE_FRESH_LISTING
+
+def get_client() -> "OpenAI":
+    global client
+    if client is None:
+        with _clients_lock:
+            if client is None:
+                from openai import OpenAI
+
+                client = OpenAI(api_key=OPENAI_API_KEY)
+    return client
+
+def get_session() -> "requests.Session":
+    global session, http_cache
+    if session is None:
+        with _clients_lock:
+            if session is None:
+                import requests
+
+                s = requests.Session()
+                s.headers.update({"User-Agent": USER_AGENT})
+                if HTTP_CACHE_ENABLED:
+                    from http_cache import CachingHTTPAdapter
+
+                    http_cache = CachingHTTPAdapter(HTTP_CACHE_FILE, http_cache_freshness, HTTP_CACHE_MAX_STALE)
+                    s.mount(REDDIT_BASE, http_cache)
+                session = s
+    return session
+
+def get_llm_cache() -> Optional["LLMCache"]:
+    global llm_cache
+    if llm_cache is None and LLM_CACHE_ENABLED:
+        with _clients_lock:
+            if llm_cache is None:
+                from llm_cache import LLMCache
+
+                llm_cache = LLMCache(LLM_CACHE_FILE, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MAX_BYTES)
+    return llm_cache
+
+def get_token_counter() -> TokenCounter:
+    global token_counter
+    if token_counter is None:
+        with _clients_lock:
+            if token_counter is None:
+                token_counter = TokenCounter(MODEL)
+    return token_counter
+
+def close_clients() -> None:
+    """Fecha o que foi criado (sessão, caches); o próximo uso recria."""
+    global client, session, http_cache, llm_cache
+    with _clients_lock:
+        if http_cache is not None:
+            http_cache.close()
+        if llm_cache is not None:
+            llm_cache.close()
+        if session is not None:
+            session.close()
+        client = session = http_cache = llm_cache = None
 
 # =========================
 # DATA MODELS
 # =========================
 
-@dataclass
+# slots: sem __dict__ por instância (varreduras grandes têm centenas de milhares de posts)
+@dataclass(slots=True)
 class RedditPost:
     id: str
     subreddit: str
@@ -64,7 +256,86 @@ class RedditPost:
     permalink: str
     image: Optional[str] = None
 
-@dataclass
+class PostBatch:
+    """
+    Posts de uma página de listagem em colunas (arrays paralelos), sem um
+    objeto por post. Subreddits ficam numa tabela de nomes (cada linha guarda só o
+    índice), imagens num dict esparso (a maioria dos posts não tem) e o permalink só
+    com o caminho. `post(i)` / iteração materializam RedditPost quando preciso.
+    """
+
+    __slots__ = (
+        "base", "ids", "titles", "paths", "images", "scores", "num_comments",
+        "created_utc", "subreddit_idx", "subreddit_names", "_subreddit_pos",
+    )
+
+    def __init__(self, base: str = ""):
+        self.base = base                    # prefixo do permalink (REDDIT_BASE)
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.paths: List[str] = []
+        self.images: Dict[int, str] = {}
+        self.scores = array("q")
+        self.num_comments = array("q")
+        self.created_utc = array("d")
+        self.subreddit_idx = array("I")
+        self.subreddit_names: List[str] = []
+        self._subreddit_pos: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[RedditPost]:
+        return (self.post(i) for i in range(len(self.ids)))
+
+    def append(
+        self,
+        id: str,
+        subreddit: str,
+        title: str,
+        score: int,
+        num_comments: int,
+        created_utc: float,
+        path: str,
+        image: Optional[str] = None,
+    ) -> None:
+        pos = self._subreddit_pos.get(subreddit)
+        if pos is None:
+            pos = self._subreddit_pos[subreddit] = len(self.subreddit_names)
+            self.subreddit_names.append(subreddit)
+        if image:
+            self.images[len(self.ids)] = image
+        self.ids.append(id)
+        self.titles.append(title)
+        self.paths.append(path)
+        self.scores.append(score)
+        self.num_comments.append(num_comments)
+        self.created_utc.append(created_utc)
+        self.subreddit_idx.append(pos)
+
+    def subreddit(self, i: int) -> str:
+        return self.subreddit_names[self.subreddit_idx[i]]
+
+    def permalink(self, i: int) -> str:
+        return f"{self.base}{self.paths[i]}"
+
+    def post(self, i: int) -> RedditPost:
+        return RedditPost(
+            id=self.ids[i],
+            subreddit=self.subreddit(i),
+            title=self.titles[i],
+            score=self.scores[i],
+            num_comments=self.num_comments[i],
+            created_utc=self.created_utc[i],
+            permalink=self.permalink(i),
+            image=self.images.get(i),
+        )
+
+    def relevant_rows(self) -> List[int]:
+        scores, comments = self.scores, self.num_comments
+        return [i for i in range(len(self.ids)) if is_relevant(scores[i], comments[i])]
+
+@dataclass(slots=True)
 class BubbleItem:
     id: str
     title: str
@@ -81,7 +352,7 @@ class BubbleItem:
     opinions: Optional[List[Dict[str, Any]]] = None
     image: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class BubbleCluster:
     key: str
     items: List[BubbleItem]
@@ -95,31 +366,36 @@ class BubbleCluster:
 def now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
-def hours_since(created_utc: float) -> float:
-    age_seconds = max(1.0, time.time() - created_utc)
+NUMPY_AVAILABLE = find_spec("numpy") is not None
+
+def hours_since(created_utc: float, now: Optional[float] = None) -> float:
+    age_seconds = max(1.0, (time.time() if now is None else now) - created_utc)
     return age_seconds / 3600.0
 
 def is_relevant(score: int, num_comments: int) -> bool:
     return (score >= MIN_UPVOTES) or (num_comments >= MIN_COMMENTS)
 
-def compute_raw_score(score: int, num_comments: int, created_utc: float) -> float:
+def compute_raw_score(score: int, num_comments: int, created_utc: float, now: Optional[float] = None) -> float:
     volume = 1.0
     depth = min(float(num_comments), 1000.0)
-    speed = (float(score) + float(num_comments)) / hours_since(created_utc)
+    speed = (float(score) + float(num_comments)) / hours_since(created_utc, now)
     return (volume * 0.35) + (depth * 0.30) + (speed * 0.35)
 
-def normalize_scores(items: List[BubbleItem]) -> None:
-    vals = [it.rawScore for it in items]
-    if not vals:
-        return
-    mn = min(vals)
-    mx = max(vals)
+def scale_score(raw: float, mn: float, mx: float) -> float:
     if mx - mn < 1e-9:
-        for it in items:
-            it.relevanceScore = 0.5
+        return 0.5
+    return (raw - mn) / (mx - mn)
+
+def normalize_scores(items: List[BubbleItem], bounds: Optional[Tuple[float, float]] = None) -> None:
+    """min/max dos próprios itens, ou `bounds` já conhecidos (ex.: acompanhados em streaming)."""
+    if not items:
         return
+    if bounds is None:
+        vals = [it.rawScore for it in items]
+        bounds = (min(vals), max(vals))
+    mn, mx = bounds
     for it in items:
-        it.relevanceScore = (it.rawScore - mn) / (mx - mn)
+        it.relevanceScore = scale_score(it.rawScore, mn, mx)
 
 def suggested_radius(relevance_score: float) -> float:
     min_radius = 36.0
@@ -127,6 +403,55 @@ def suggested_radius(relevance_score: float) -> float:
     r = min_radius + (math.sqrt(max(0.0, relevance_score)) * (max_radius - min_radius))
     return round(r, 2)
 
+# --- scoring em lote (NumPy): mesmas fórmulas das funções acima, sobre arrays inteiros.
+# Aceitam listas, arrays NumPy ou array.array (colunas do PostBatch, sem cópia).
+
+def compute_raw_scores(score: Any, num_comments: Any, created_utc: Any, now: Optional[float] = None) -> "np.ndarray":
+    """compute_raw_score vetorizado; `now` único para o lote todo (padrão: agora)."""
+    import numpy as np
+
+    score = np.asarray(score, dtype=np.float64)
+    num_comments = np.asarray(num_comments, dtype=np.float64)
+    created_utc = np.asarray(created_utc, dtype=np.float64)
+    if now is None:
+        now = time.time()
+    hours = np.maximum(1.0, now - created_utc) / 3600.0
+    depth = np.minimum(num_comments, 1000.0)
+    speed = (score + num_comments) / hours
+    return (1.0 * 0.35) + (depth * 0.30) + (speed * 0.35)
+
+def normalize_scores_array(raw: Any, bounds: Optional[Tuple[float, float]] = None) -> "np.ndarray":
+    """normalize_scores vetorizado (min/max do próprio array ou `bounds`)."""
+    import numpy as np
+
+    raw = np.asarray(raw, dtype=np.float64)
+    if raw.size == 0:
+        return raw.copy()
+    mn, mx = bounds if bounds is not None else (float(raw.min()), float(raw.max()))
+    if mx - mn < 1e-9:
+        return np.full(raw.shape, 0.5)
+    return (raw - mn) / (mx - mn)
+
+def suggested_radii(relevance: Any) -> "np.ndarray":
+    """suggested_radius vetorizado."""
+    import numpy as np
+
+    min_radius = 36.0
+    max_radius = 96.0
+    r = min_radius + np.sqrt(np.maximum(0.0, np.asarray(relevance, dtype=np.float64))) * (max_radius - min_radius)
+    return np.round(r, 2)
+
+def score_batch(
+    score: Any,
+    num_comments: Any,
+    created_utc: Any,
+    now: Optional[float] = None,
+) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """(rawScore, relevanceScore, suggestedRadius) de um lote inteiro, num único instante de referência."""
+    raw = compute_raw_scores(score, num_comments, created_utc, now)
+    relevance = normalize_scores_array(raw)
+    return raw, relevance, suggested_radii(relevance)
+
 def safe_text(s: str) -> str:
     s = (s or "").strip()
     s = re.sub(r"\s+", " ", s)
@@ -189,39 +514,170 @@ def cluster_key_from_title(title: str) -> str:
     kws = extract_keywords(title)
     return "|".join(sorted(kws[:10]))  # chave um pouco mais “rica” para reduzir colisões
 
-def cluster_bubbles(items: List[BubbleItem]) -> List[BubbleCluster]:
+def set_cluster_scores(clusters: List[BubbleCluster]) -> None:
+    # score do cluster: usa o maior rawScore (mais estável e evita “superinflar” por repetição)
+    for c in clusters:
+        c.rawScore = max(x.rawScore for x in c.items)
+
+def cluster_bubbles(items: List[BubbleItem], engine: Optional[str] = None) -> List[BubbleCluster]:
+    """
+    Agrupa posts com o engine configurado (CLUSTER_ENGINE).
+    "tfidf" cai para "keywords" quando numpy/scipy não estão instalados.
+    """
+    if engine is None:
+        engine = CLUSTER_ENGINE
+    if engine == "tfidf":
+        if tfidf_clustering.AVAILABLE:
+            return cluster_bubbles_tfidf(items)
+        print("[WARN] numpy/scipy indisponíveis; usando clusterização por keywords")
+    elif engine != "keywords":
+        raise ValueError(f"CLUSTER_ENGINE desconhecido: {engine!r}")
+    return cluster_bubbles_keywords(items)
+
+def cluster_bubbles_tfidf(items: List[BubbleItem]) -> List[BubbleCluster]:
+    """
+    Agrupa posts por similaridade de cosseno TF-IDF com o primeiro post de cada grupo
+    (o líder). A chave do cluster vem desse post, como na versão por keywords.
+    """
+    groups = tfidf_clustering.cluster_titles(
+        [it.title for it in items],
+        extract_keywords,
+        threshold=CLUSTER_TFIDF_THRESHOLD,
+        block_size=CLUSTER_TFIDF_BLOCK,
+        max_df=CLUSTER_TFIDF_MAX_DF,
+    )
+    clusters = [
+        BubbleCluster(key=cluster_key_from_title(items[g[0]].title), items=[items[i] for i in g])
+        for g in groups
+    ]
+    set_cluster_scores(clusters)
+    return clusters
+
+def cluster_bubbles_keywords(items: List[BubbleItem]) -> List[BubbleCluster]:
     """
     Agrupa posts por sobreposição de keywords.
     Mantém clusterização simples/interpretável.
+    Cada post entra no primeiro cluster (ordem de criação) com keywords suficientes em comum;
+    o índice invertido keyword -> clusters evita varrer todos os clusters a cada post.
     """
     clusters: List[BubbleCluster] = []
+    index: Dict[str, List[int]] = {}  # keyword -> posições dos clusters (em ordem crescente)
 
     for it in items:
         kws = set(extract_keywords(it.title))
         matched: Optional[BubbleCluster] = None
 
-        for c in clusters:
-            ckws = set(c.key.split("|")) if c.key else set()
-            if len(kws & ckws) >= CLUSTER_MIN_OVERLAP:
-                matched = c
-                break
+        if CLUSTER_MIN_OVERLAP <= 0:
+            # qualquer cluster serve: o primeiro criado
+            matched = clusters[0] if clusters else None
+        elif CLUSTER_MIN_OVERLAP == 1:
+            firsts = [index[w][0] for w in kws if w in index]
+            if firsts:
+                matched = clusters[min(firsts)]
+        else:
+            counts: Dict[int, int] = {}
+            best: Optional[int] = None
+            for w in kws:
+                for ci in index.get(w, ()):
+                    n = counts.get(ci, 0) + 1
+                    counts[ci] = n
+                    if n >= CLUSTER_MIN_OVERLAP and (best is None or ci < best):
+                        best = ci
+            if best is not None:
+                matched = clusters[best]
 
         if matched:
             matched.items.append(it)
         else:
-            clusters.append(
-                BubbleCluster(
-                    key=cluster_key_from_title(it.title),
-                    items=[it],
-                )
-            )
-
-    # score do cluster: usa o maior rawScore (mais estável e evita “superinflar” por repetição)
-    for c in clusters:
-        c.rawScore = max(x.rawScore for x in c.items)
+            key = cluster_key_from_title(it.title)
+            clusters.append(BubbleCluster(key=key, items=[it]))
+            for w in (set(key.split("|")) if key else set()):
+                index.setdefault(w, []).append(len(clusters) - 1)
 
+    set_cluster_scores(clusters)
     return clusters
 
+class TokenBucket:
+    """
+    Rate limiter compartilhado (token bucket).
+    Cada requisição reserva 1 token; se o bucket estiver vazio, espera o
+    tempo necessário para a reposição. Seguro entre threads (as páginas das
+    listagens são buscadas em threads via asyncio.to_thread).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(1e-6, float(rate))
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.0
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+class HostLimiter:
+    """Limita o número de requisições simultâneas por host."""
+
+    def __init__(self, per_host: int):
+        self.per_host = max(1, int(per_host))
+        self._sems: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.per_host)
+                self._sems[host] = sem
+            return sem
+
+class AdaptiveLimiter:
+    """
+    Limite de chamadas em voo ajustado em AIMD:
+    cada sucesso soma ~1 ao limite por "janela" (additive increase),
+    cada 429 multiplica o limite por LLM_AIMD_DECREASE (multiplicative decrease)
+    e, havendo Retry-After, pausa novas chamadas até o prazo indicado.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = float(min(self.maximum, max(self.minimum, int(initial))))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, rate_limited: bool = False, retry_after: Optional[float] = None) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(float(self.minimum), self.limit * LLM_AIMD_DECREASE)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
 def select_cluster_image(cluster: BubbleCluster) -> Optional[str]:
     items_sorted = sorted(cluster.items, key=lambda x: x.rawScore, reverse=True)
     for it in items_sorted:
@@ -233,13 +689,23 @@ def select_cluster_image(cluster: BubbleCluster) -> Optional[str]:
 # REDDIT FETCH
 # =========================
 
-def fetch_hot_posts(subreddit: str, limit: int = 50) -> List[RedditPost]:
+@metrics.timed("fetch_hot_posts")
+def fetch_listing_page(
+    subreddit: str,
+    limit: int = 50,
+    after: Optional[str] = None,
+) -> Tuple[PostBatch, Optional[str]]:
+    """Uma página de hot.json em colunas. Retorna (posts, cursor da próxima página ou None)."""
     url = f"{REDDIT_BASE}/r/{subreddit}/hot.json"
-    resp = session.get(url, params={"limit": limit}, timeout=20)
+    params: Dict[str, Any] = {"limit": limit}
+    if after:
+        params["after"] = after
+    resp = get_session().get(url, params=params, timeout=20)
     resp.raise_for_status()
 
-    posts: List[RedditPost] = []
-    for c in resp.json().get("data", {}).get("children", []):
+    data = resp.json().get("data", {})
+    batch = PostBatch(REDDIT_BASE)
+    for c in data.get("children", []):
         d = c.get("data", {})
         if not d:
             continue
@@ -248,23 +714,67 @@ def fetch_hot_posts(subreddit: str, limit: int = 50) -> List[RedditPost]:
         if not pid:
             continue
 
-        posts.append(
-            RedditPost(
-                id=pid,
-                subreddit=subreddit,
-                title=safe_text(d.get("title", "")),
-                score=int(d.get("score", 0) or 0),
-                num_comments=int(d.get("num_comments", 0) or 0),
-                created_utc=float(d.get("created_utc", 0.0) or 0.0),
-                permalink=f"{REDDIT_BASE}{d.get('permalink', '')}",
-                image=extract_image_from_post(d),
-            )
+        batch.append(
+            id=pid,
+            subreddit=subreddit,
+            title=safe_text(d.get("title", "")),
+            score=int(d.get("score", 0) or 0),
+            num_comments=int(d.get("num_comments", 0) or 0),
+            created_utc=float(d.get("created_utc", 0.0) or 0.0),
+            path=d.get("permalink", ""),
+            image=extract_image_from_post(d),
         )
-    return posts
+    return batch, data.get("after") or None
 
+def fetch_hot_posts(subreddit: str, limit: int = 50) -> List[RedditPost]:
+    return list(fetch_listing_page(subreddit, limit)[0])
+
+def iter_hot_pages(
+    subreddit: str,
+    page_size: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    bucket: Optional[TokenBucket] = None,
+) -> Iterator[PostBatch]:
+    """
+    Varre a listagem seguindo o cursor `after` e entrega cada página à medida que
+    chega (só uma página em memória por vez).
+    Para quando: acabam as páginas, o orçamento `max_pages` é atingido ou
+    (LISTING_STOP_ON_IRRELEVANT_PAGE) uma página não traz nenhum post relevante.
+    Falha na primeira página propaga; nas seguintes, encerra com o que já foi entregue.
+    """
+    page_size = page_size or LISTING_PAGE_SIZE
+    max_pages = max(1, max_pages or LISTING_MAX_PAGES)
+    after: Optional[str] = None
+    for page in range(max_pages):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            batch, after = fetch_listing_page(subreddit, page_size, after)
+        except Exception as e:
+            if page == 0:
+                raise
+            print(f"[WARN] Falha na página {page + 1} de r/{subreddit}: {e}")
+            return
+        yield batch
+        if not after or not len(batch):
+            return
+        if LISTING_STOP_ON_IRRELEVANT_PAGE and not batch.relevant_rows():
+            return
+
+def iter_hot_posts(
+    subreddit: str,
+    page_size: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    bucket: Optional[TokenBucket] = None,
+) -> Iterator[RedditPost]:
+    """Mesma varredura de iter_hot_pages, post a post."""
+    for batch in iter_hot_pages(subreddit, page_size, max_pages, bucket):
+        yield from batch
+
+@metrics.timed("fetch_top_comments")
 def fetch_top_comments(post_id: str, subreddit: str, limit: int) -> List[Dict[str, Any]]:
     url = f"{REDDIT_BASE}/r/{subreddit}/comments/{post_id}.json"
-    resp = session.get(url, params={"sort": "top", "limit": 50}, timeout=20)
+    resp = get_session().get(url, params={"sort": "top", "limit": 50}, timeout=20)
     resp.raise_for_status()
 
     data = resp.json()
@@ -393,6 +903,43 @@ COMENTÁRIOS (candidatos):
 {comments_block}
 """.strip()
 
+PACKED_USER_PROMPT_TEMPLATE = (
+    """
+Você receberá VÁRIOS temas, cada um num bloco CLUSTER com um id próprio.
+Trate cada cluster de forma independente, aplicando a ele todas as regras abaixo.
+
+""".lstrip()
+    + USER_PROMPT_TEMPLATE.split("FORMATO DE SAÍDA:")[0]
+    + """FORMATO DE SAÍDA:
+- Retorne APENAS um array JSON válido, com um objeto por cluster, na ordem dos blocos
+- NÃO use markdown
+- Cada objeto deve ter EXATAMENTE esta estrutura ("cluster_id" = id do bloco):
+
+{{
+  "cluster_id": "c1",
+  "title": "....",
+  "label": "....",
+  "context": "....",
+  "opinions": [
+    {{"id": "op1", "tone": "positive", "text": "....", "source": "reddit"}},
+    {{"id": "op2", "tone": "negative", "text": "....", "source": "reddit"}},
+    {{"id": "op3", "tone": "neutral", "text": "....", "source": "reddit"}}
+  ]
+}}
+
+{clusters_block}
+"""
+).strip()
+
+PACKED_CLUSTER_TEMPLATE = """
+=== CLUSTER {cluster_id} ===
+TÍTULO (original): "{title}"
+SUBREDDIT: {subreddit}
+
+COMENTÁRIOS (candidatos):
+{comments_block}
+""".strip()
+
 def _extract_json(text: str) -> Dict[str, Any]:
     text = (text or "").strip()
 
@@ -420,7 +967,7 @@ def _extract_json(text: str) -> Dict[str, Any]:
     except Exception as e:
         raise ValueError(f"Resposta sem JSON válido detectável: {e}")
 
-def _clean_opinions(opinions: Any) -> List[Dict[str, Any]]:
+def _filter_opinions(opinions: Any) -> List[Dict[str, Any]]:
     if not isinstance(opinions, list):
         opinions = []
     cleaned: List[Dict[str, Any]] = []
@@ -442,130 +989,648 @@ def _clean_opinions(opinions: Any) -> List[Dict[str, Any]]:
                 "votes": 0,
             }
         )
+    return cleaned
+
+def _clean_opinions(opinions: Any) -> List[Dict[str, Any]]:
+    cleaned = _filter_opinions(opinions)
     if len(cleaned) == 3:
         return cleaned
-    # fallback seguro
+    # último recurso (modelo e reparo falharam): opiniões genéricas
+    metrics.incr("llm.placeholders")
     return [
         {"id": "op1", "tone": "positive", "text": "Há quem defenda essa medida como necessária.", "source": "reddit", "votes": 0},
         {"id": "op2", "tone": "negative", "text": "Outros criticam e veem riscos ou consequências negativas.", "source": "reddit", "votes": 0},
         {"id": "op3", "tone": "neutral",  "text": "Também há quem prefira esperar mais informações antes de concluir.", "source": "reddit", "votes": 0},
     ]
 
-def generate_context_and_opinions(title: str, subreddit: str, comments: List[Dict[str, Any]]) -> Dict[str, Any]:
+def build_comments_block(comments: List[Dict[str, Any]], token_budget: Optional[int] = None) -> str:
+    """
+    Sem `token_budget`: até MAX_COMMENTS_PER_POST comentários, cada um cortado em 350 caracteres.
+    Com `token_budget`: percorre os comentários por score (desc) e inclui cada um
+    (truncado em PROMPT_MAX_TOKENS_PER_COMMENT tokens) enquanto couber no orçamento.
+    """
     lines: List[str] = []
-    for i, c in enumerate(comments[:MAX_COMMENTS_PER_POST], start=1):
-        lines.append(f"{i:02d}) (+{c.get('score',0)}) {safe_text(c.get('text',''))[:350]}")
-    comments_block = "\n".join(lines) if lines else "- sem comentários suficientes -"
-
-    resp = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": USER_PROMPT_TEMPLATE.format(
-                    title=title,
-                    subreddit=subreddit,
-                    comments_block=comments_block,
-                ),
-            },
-        ],
-        temperature=0.1,
-        max_tokens=550,
-    )
+    if token_budget is None:
+        for i, c in enumerate(comments[:MAX_COMMENTS_PER_POST], start=1):
+            lines.append(f"{i:02d}) (+{c.get('score',0)}) {safe_text(c.get('text',''))[:350]}")
+        return "\n".join(lines) if lines else "- sem comentários suficientes -"
+
+    used = 0
+    ranked = sorted(comments, key=lambda x: int(x.get("score", 0) or 0), reverse=True)
+    for c in ranked[:MAX_COMMENTS_PER_POST]:
+        text = get_token_counter().truncate(safe_text(c.get("text", "")), PROMPT_MAX_TOKENS_PER_COMMENT)
+        line = f"{len(lines) + 1:02d}) (+{c.get('score',0)}) {text}"
+        cost = get_token_counter().count(line) + 1  # + quebra de linha
+        if used + cost > token_budget:
+            continue  # não cabe; um comentário menor ainda pode caber
+        lines.append(line)
+        used += cost
+    return "\n".join(lines) if lines else "- sem comentários suficientes -"
+
+def comments_token_budget(title: str, subreddit: str) -> Optional[int]:
+    """Tokens que sobram para os comentários depois do system prompt e do template."""
+    if not PROMPT_BUDGET_ENABLED:
+        return None
+    skeleton = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": USER_PROMPT_TEMPLATE.format(title=title, subreddit=subreddit, comments_block="")},
+    ]
+    return max(0, PROMPT_MAX_INPUT_TOKENS - get_token_counter().count_messages(skeleton))
 
-    raw = (resp.choices[0].message.content or "").strip()
-    data = _extract_json(raw)
+def build_messages(title: str, subreddit: str, comments: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": USER_PROMPT_TEMPLATE.format(
+                title=title,
+                subreddit=subreddit,
+                comments_block=build_comments_block(comments, comments_token_budget(title, subreddit)),
+            ),
+        },
+    ]
 
-    out: Dict[str, Any] = {
+def parse_enrichment(
+    raw: str,
+    title: str = "",
+    subreddit: str = "",
+    llm: Optional["OpenAI"] = None,
+) -> Dict[str, Any]:
+    """Texto do modelo → enriquecimento; com `llm`, campos inválidos passam por reparo."""
+    try:
+        data: Any = _extract_json((raw or "").strip())
+    except ValueError as e:
+        print(f"[WARN] Resposta do modelo ilegível: {e}")
+        metrics.incr("llm.parse_failures")
+        data = None
+    return validated_enrichment(data, raw, title, subreddit, llm)
+
+def validated_enrichment(
+    data: Any,
+    raw: str,
+    title: str,
+    subreddit: str,
+    llm: Optional["OpenAI"] = None,
+    fallback: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """
+    Valida campo a campo. Os inválidos (ou a resposta inteira, se `data` não é um
+    objeto) vão num pedido de reparo curto; só o que continuar inválido cai nos
+    fallbacks de enrichment_from_data (opiniões genéricas de _clean_opinions).
+    Com fallback=False, retorna None nesse caso (o chamador decide).
+    """
+    metrics.incr("llm.responses")
+    errors = validate_enrichment(data)
+    if errors:
+        metrics.incr("llm.invalid")
+        if LLM_REPAIR_ENABLED and llm is not None:
+            raw_text = raw if not isinstance(data, dict) else None
+            data = repair_enrichment(data, errors, raw_text, title, subreddit, llm)
+            errors = validate_enrichment(data)
+            if not errors:
+                metrics.incr("llm.repaired")
+        if errors and not fallback:
+            return None
+        if errors:
+            print(f"[WARN] Enriquecimento com campos inválidos ({', '.join(errors)}): {title[:60]}")
+    return enrichment_from_data(data if isinstance(data, dict) else {})
+
+def repair_enrichment(
+    data: Any,
+    errors: Dict[str, str],
+    raw: Optional[str],
+    title: str,
+    subreddit: str,
+    llm: "OpenAI",
+) -> Any:
+    """Pede só os campos de `errors` (ou a conversão de `raw`) e devolve `data` com eles trocados."""
+    fields = [f for f in structured_output.ENRICHMENT_FIELDS if f in errors]
+    params: Dict[str, Any] = {
+        "model": MODEL,
+        "messages": build_repair_messages(data, errors, title, subreddit, raw),
+        "temperature": TEMPERATURE,
+        "max_tokens": LLM_REPAIR_MAX_TOKENS,
+    }
+    if use_structured_output():
+        params["response_format"] = response_format(fields)
+    metrics.incr("llm.repairs")
+    try:
+        resp = create_completion(llm, params, "chat.completions.create[repair]")
+        patch = _extract_json(resp.choices[0].message.content or "")
+    except Exception as e:
+        print(f"[WARN] Falha no reparo do enriquecimento: {e}")
+        return data
+    return merge_repair(data, patch, fields)
+
+def enrichment_from_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         "title": safe_text(data.get("title", ""))[:160],
         "label": safe_text(data.get("label", ""))[:60],
         "context": safe_text(data.get("context", ""))[:700],
         "opinions": _clean_opinions(data.get("opinions")),
     }
+
+def _extract_json_array(text: str) -> List[Any]:
+    text = (text or "").strip()
+    try:
+        data = json.loads(text)
+    except Exception:
+        m = re.search(r"\[.*\]", text, flags=re.DOTALL)
+        if not m:
+            raise ValueError("Resposta sem array JSON detectável")
+        data = json.loads(m.group(0))
+    if isinstance(data, dict):
+        # modelo embrulhou o array num objeto ({"clusters": [...]}) ou mandou um só
+        data = data.get("clusters") or data.get("items") or [data]
+    if not isinstance(data, list):
+        raise ValueError("Resposta empacotada não é uma lista")
+    return data
+
+def build_packed_messages(jobs: List[Tuple[str, str, str, List[Dict[str, Any]]]]) -> List[Dict[str, str]]:
+    blocks = [
+        PACKED_CLUSTER_TEMPLATE.format(
+            cluster_id=cid,
+            title=title,
+            subreddit=subreddit,
+            # mesmo bloco (e orçamento) da chamada individual
+            comments_block=build_comments_block(comments, comments_token_budget(title, subreddit)),
+        )
+        for cid, title, subreddit, comments in jobs
+    ]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": PACKED_USER_PROMPT_TEMPLATE.format(clusters_block="\n\n".join(blocks))},
+    ]
+
+def completion_params(messages: List[Dict[str, str]], packed: bool = False) -> Dict[str, Any]:
+    params: Dict[str, Any] = {
+        "model": MODEL,
+        "messages": messages,
+        "temperature": TEMPERATURE,
+        "max_tokens": 550,
+    }
+    if use_structured_output():
+        params["response_format"] = response_format(packed=packed)
+    return params
+
+def use_structured_output() -> bool:
+    return STRUCTURED_OUTPUT and not structured_output_rejected
+
+def _rejects_response_format(e: Exception) -> bool:
+    from openai import BadRequestError
+
+    return isinstance(e, BadRequestError) and "response_format" in str(e)
+
+def create_completion(llm: "OpenAI", params: Dict[str, Any], call_name: str) -> Any:
+    """
+    chat.completions.create medido em `call_name`. Se o endpoint/modelo recusar o
+    response_format (400), repete uma vez sem ele e desliga a saída estruturada
+    pelo resto da execução (volta ao JSON pedido só pelo prompt).
+    """
+    global structured_output_rejected
+    try:
+        with metrics.call(call_name):
+            return llm.chat.completions.create(**params)
+    except Exception as e:
+        if "response_format" not in params or not _rejects_response_format(e):
+            raise
+        if not structured_output_rejected:
+            structured_output_rejected = True
+            metrics.incr("llm.structured_output_rejected")
+            print(f"[WARN] response_format recusado; seguindo sem saída estruturada: {e}")
+    params = {k: v for k, v in params.items() if k != "response_format"}
+    with metrics.call(call_name):
+        return llm.chat.completions.create(**params)
+
+def cache_key_for(messages: List[Dict[str, str]]) -> str:
+    from llm_cache import LLMCache  # só chamado com o cache ativo (já importado por get_llm_cache)
+
+    return LLMCache.make_key(MODEL, TEMPERATURE, messages[0]["content"], messages[1]["content"])
+
+def prompt_key(messages: List[Dict[str, str]]) -> str:
+    # chave do prompt para as estatísticas quando não há cache (sem importar o llm_cache)
+    return hashlib.sha256("\x00".join(m["content"] for m in messages).encode("utf-8")).hexdigest()
+
+def record_prompt(key: str, messages: List[Dict[str, str]], clusters: Optional[List[str]] = None) -> None:
+    # tokens do prompt enviado, por id de representante (estatística e métrica prompt_tokens)
+    tokens = get_token_counter().count_messages(messages)
+    prompt_stats.record(key, tokens, clusters)
+    metrics.set_value("prompt_tokens", key, tokens)
+
+def cache_result(cache_key: str, out: Dict[str, Any]) -> None:
+    # só guarda respostas completas (não congela falhas do modelo por TTL)
+    cache = get_llm_cache()
+    if cache is not None and out["label"] and out["context"]:
+        cache.put(cache_key, out)
+
+def generate_context_and_opinions(
+    title: str,
+    subreddit: str,
+    comments: List[Dict[str, Any]],
+    llm: Optional["OpenAI"] = None,
+    stats_key: str = "",
+) -> Dict[str, Any]:
+    """`stats_key`: id do representante nas estatísticas de tokens do prompt."""
+    messages = build_messages(title, subreddit, comments)
+
+    cache_key = ""
+    cache = get_llm_cache()
+    if cache is not None:
+        cache_key = cache_key_for(messages)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    record_prompt(stats_key or cache_key or prompt_key(messages), messages)
+    llm = llm or get_client()
+    resp = create_completion(llm, completion_params(messages), "chat.completions.create")
+
+    out = parse_enrichment(resp.choices[0].message.content or "", title, subreddit, llm)
+    cache_result(cache_key, out)
     return out
 
+def generate_packed(
+    jobs: List[Tuple[str, str, List[Dict[str, Any]]]],
+    llm: Optional["OpenAI"] = None,
+    stats_keys: Optional[List[str]] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Enriquece vários clusters (title, subreddit, comments) numa única chamada:
+    o modelo devolve um array com um objeto por cluster_id. Cada elemento é validado
+    sozinho; os incompletos/ausentes ficam None para serem reenviados individualmente.
+    Elementos presentes mas com campos inválidos passam pelo reparo direcionado.
+    O cache usa a mesma chave da chamada individual de cada cluster. `stats_keys`:
+    ids dos representantes (um por job) nas estatísticas de tokens do prompt.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    todo: List[Tuple[int, str, str]] = []  # (posição, cluster_id, chave do cache)
+    for i, (title, subreddit, comments) in enumerate(jobs):
+        cache_key = ""
+        cache = get_llm_cache()
+        if cache is not None:
+            cache_key = cache_key_for(build_messages(title, subreddit, comments))
+            cached = cache.get(cache_key)
+            if cached is not None:
+                results[i] = cached
+                continue
+        todo.append((i, f"c{i + 1}", cache_key))
+
+    if not todo:
+        return results
+
+    messages = build_packed_messages([(cid, *jobs[i]) for i, cid, _ in todo])
+    if stats_keys:
+        ids = [stats_keys[i] for i, _, _ in todo]
+        record_prompt("+".join(ids), messages, clusters=ids)
+    else:
+        key = prompt_key(messages)
+        record_prompt(key, messages, clusters=[f"{key}:{cid}" for _, cid, _ in todo])
+    params = completion_params(messages, packed=True)
+    params["max_tokens"] = PACK_MAX_TOKENS_PER_CLUSTER * len(todo)
+    llm = llm or get_client()
+    resp = create_completion(llm, params, "chat.completions.create[packed]")
+
+    try:
+        elements = _extract_json_array(resp.choices[0].message.content or "")
+    except ValueError as e:
+        print(f"[WARN] Resposta empacotada ilegível: {e}")
+        # contado à parte: esses clusters voltam como respostas individuais (llm.responses)
+        metrics.incr("llm.pack_parse_failures")
+        return results
+
+    by_id = {str(el.get("cluster_id")): el for el in elements if isinstance(el, dict)}
+    for i, cid, cache_key in todo:
+        el = by_id.get(cid)
+        if el is None:
+            continue  # ausente no pacote: vai na chamada individual
+        title, subreddit, _ = jobs[i]
+        out = validated_enrichment(el, "", title, subreddit, llm, fallback=False)
+        if out is None:
+            continue
+        results[i] = out
+        cache_result(cache_key, out)
+    return results
+
+def generate_batch(
+    jobs: List[Tuple[str, str, List[Dict[str, Any]]]],
+    llm: Optional["OpenAI"] = None,
+    stats_keys: Optional[List[str]] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Enriquecimento via Batch API: renderiza os prompts de todos os `jobs`
+    (title, subreddit, comments) num JSONL, envia um único lote e consulta o status
+    até terminar. Cada linha de saída volta ao job pelo custom_id e passa pelo mesmo
+    parse_enrichment do fluxo interativo. Jobs sem resultado (lote falhou/expirou,
+    linha com erro) ficam None para o chamador decidir o fallback. `stats_keys`:
+    ids dos representantes (um por job) nas estatísticas de tokens do prompt.
+    """
+    llm = llm or get_client()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    cache_keys: Dict[str, Tuple[int, str]] = {}
+
+    lines: List[str] = []
+    for i, (title, subreddit, comments) in enumerate(jobs):
+        messages = build_messages(title, subreddit, comments)
+        cache_key = ""
+        cache = get_llm_cache()
+        if cache is not None:
+            cache_key = cache_key_for(messages)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                results[i] = cached
+                continue
+        custom_id = f"cluster-{i}"
+        cache_keys[custom_id] = (i, cache_key)
+        record_prompt(stats_keys[i] if stats_keys else cache_key or prompt_key(messages), messages)
+        lines.append(
+            json.dumps(
+                {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": completion_params(messages)},
+                ensure_ascii=False,
+            )
+        )
+
+    if not lines:
+        return results
+
+    with open(BATCH_INPUT_FILE, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    with open(BATCH_INPUT_FILE, "rb") as f, metrics.call("files.create"):
+        uploaded = llm.files.create(file=f, purpose="batch")
+    with metrics.call("batches.create"):
+        batch = llm.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+    print(f"📦 Lote {batch.id} enviado com {len(lines)} prompts; aguardando conclusão...")
+
+    deadline = time.monotonic() + BATCH_TIMEOUT_SECONDS
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        if time.monotonic() >= deadline:
+            print(f"[WARN] Lote {batch.id} não terminou a tempo; cancelando")
+            try:
+                batch = llm.batches.cancel(batch.id)
+            except Exception as e:
+                print(f"[WARN] Falha ao cancelar lote: {e}")
+            break
+        time.sleep(BATCH_POLL_INTERVAL)
+        with metrics.call("batches.retrieve"):
+            batch = llm.batches.retrieve(batch.id)
+
+    print(f"📦 Lote {batch.id}: status={batch.status}")
+    # lotes expirados/cancelados ainda podem trazer resultados parciais
+    if not batch.output_file_id:
+        return results
+
+    with metrics.call("files.content"):
+        output = llm.files.content(batch.output_file_id).text
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+            i, cache_key = cache_keys[rec.get("custom_id")]
+            response = rec.get("response") or {}
+            if rec.get("error") or response.get("status_code") != 200:
+                print(f"[WARN] Linha do lote com erro ({rec.get('custom_id')}): {rec.get('error')}")
+                continue
+            title, subreddit, _ = jobs[i]
+            out = parse_enrichment(response["body"]["choices"][0]["message"]["content"] or "", title, subreddit, llm)
+        except Exception as e:
+            print(f"[WARN] Linha do lote ilegível: {e}")
+            continue
+        results[i] = out
+        cache_result(cache_key, out)
+    return results
+
+def _retry_after_seconds(e: "RateLimitError") -> Optional[float]:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+T = TypeVar("T")
+
+def call_with_backoff(limiter: AdaptiveLimiter, call: Callable[["OpenAI"], T]) -> T:
+    """
+    Chama o modelo respeitando o limite adaptativo.
+    Os 429 são tratados aqui (o client não re-tenta sozinho) para que o limiter
+    enxergue cada rate limit e o Retry-After.
+    """
+    from openai import RateLimitError
+
+    llm = get_client().with_options(max_retries=0)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            result = call(llm)
+        except RateLimitError as e:
+            retry_after = _retry_after_seconds(e)
+            limiter.release(rate_limited=True, retry_after=retry_after)
+            if attempt >= LLM_MAX_RETRIES:
+                raise
+            if retry_after is None:
+                time.sleep(LLM_BACKOFF_BASE * (2 ** attempt))
+            continue
+        except Exception:
+            limiter.release()
+            raise
+        limiter.release()
+        return result
+    raise RuntimeError("unreachable")
+
+def generate_with_backoff(
+    limiter: AdaptiveLimiter,
+    title: str,
+    subreddit: str,
+    comments: List[Dict[str, Any]],
+    stats_key: str = "",
+) -> Dict[str, Any]:
+    return call_with_backoff(
+        limiter, lambda llm: generate_context_and_opinions(title, subreddit, comments, llm=llm, stats_key=stats_key)
+    )
+
 # =========================
 # PIPELINE
 # =========================
 
-def build_bubbles_from_reddit() -> List[BubbleItem]:
-    collected: List[BubbleItem] = []
+def batch_to_bubbles(batch: PostBatch) -> List[BubbleItem]:
+    """
+    Posts relevantes da página → BubbleItem, lendo as colunas direto (sem criar RedditPost).
+    Com VECTORIZED_SCORING e numpy, o rawScore da página sai de uma conta só.
+    """
+    out: List[BubbleItem] = []
+    rows = batch.relevant_rows()
+    if not rows:
+        return out
+    now = time.time()  # mesma referência para a página inteira
+    raws: Optional[List[float]] = None
+    if VECTORIZED_SCORING and NUMPY_AVAILABLE:
+        raws = compute_raw_scores(batch.scores, batch.num_comments, batch.created_utc, now).tolist()
+    for i in rows:
+        created = batch.created_utc[i]
+        raw = raws[i] if raws is not None else compute_raw_score(batch.scores[i], batch.num_comments[i], created, now)
+        out.append(
+            BubbleItem(
+                id=f"reddit_{batch.ids[i]}",
+                title=batch.titles[i],
+                source="reddit",
+                subreddit=batch.subreddit(i),
+                permalink=batch.permalink(i),
+                createdAt=datetime.fromtimestamp(created, tz=timezone.utc).isoformat(),
+                rawScore=raw,
+                image=batch.images.get(i),
+            )
+        )
+    return out
+
+def listing_to_bubbles(subreddit: str, bucket: Optional[TokenBucket] = None) -> List[BubbleItem]:
+    """Varre a listagem do subreddit e converte cada página em BubbleItem (só os relevantes)."""
+    out: List[BubbleItem] = []
+    for batch in iter_hot_pages(subreddit, bucket=bucket):
+        out.extend(batch_to_bubbles(batch))
+    return out
+
+async def fetch_hot_posts_async(subreddits: List[str], sink: Callable[[List[BubbleItem]], None]) -> None:
+    """
+    Varre as listagens de todos os subreddits em paralelo (cada uma paginada numa thread).
+    O ritmo de todas as páginas é controlado por um token bucket compartilhado (em vez de sleeps fixos).
+    Os posts viram BubbleItem conforme chegam: só os relevantes ficam em memória.
+    Cada subreddit é entregue a `sink` assim que ele e os anteriores terminam (mesma
+    ordem de `subreddits`); os que falharam são pulados.
+    """
+    import asyncio
+
+    bucket = TokenBucket(FETCH_RATE_PER_SEC, FETCH_BURST)
+    sem = asyncio.Semaphore(FETCH_MAX_CONCURRENCY)
+
+    async def one(sub: str) -> Optional[List[BubbleItem]]:
+        async with sem:
+            try:
+                return await asyncio.to_thread(listing_to_bubbles, sub, bucket)
+            except Exception as e:
+                print(f"[WARN] Falha ao buscar r/{sub}: {e}")
+                return None
+
+    tasks = [asyncio.create_task(one(sub)) for sub in subreddits]
+    for task in tasks:
+        bubbles = await task
+        if bubbles is not None:
+            sink(bubbles)
+
+def stream_bubbles_from_reddit(sink: Callable[[List[BubbleItem]], None], async_fetch: Optional[bool] = None) -> None:
+    """Coleta os subreddits e entrega os posts relevantes de cada um a `sink`, em ordem."""
+    if async_fetch is None:
+        async_fetch = ASYNC_FETCH
+
+    if async_fetch:
+        import asyncio
+
+        asyncio.run(fetch_hot_posts_async(SUBREDDITS, sink))
+        return
+
+    # serial: páginas de um mesmo subreddit também respeitam a taxa
+    bucket = TokenBucket(FETCH_RATE_PER_SEC, 1)
     for sub in SUBREDDITS:
         try:
-            posts = fetch_hot_posts(sub)
+            bubbles = listing_to_bubbles(sub, bucket)
         except Exception as e:
             print(f"[WARN] Falha ao buscar r/{sub}: {e}")
             continue
 
-        posts = [p for p in posts if is_relevant(p.score, p.num_comments)]
-        for p in posts:
-            collected.append(
-                BubbleItem(
-                    id=f"reddit_{p.id}",
-                    title=p.title,
-                    source="reddit",
-                    subreddit=p.subreddit,
-                    permalink=p.permalink,
-                    createdAt=datetime.fromtimestamp(p.created_utc, tz=timezone.utc).isoformat(),
-                    rawScore=compute_raw_score(p.score, p.num_comments, p.created_utc),
-                    image=p.image,
-                )
-            )
+        sink(bubbles)
         time.sleep(SLEEP_BETWEEN_SUBS)
+
+def build_bubbles_from_reddit(async_fetch: Optional[bool] = None) -> List[BubbleItem]:
+    collected: List[BubbleItem] = []
+    stream_bubbles_from_reddit(collected.extend, async_fetch)
     return collected
 
-def dedupe_bubbles(items: List[BubbleItem]) -> List[BubbleItem]:
-    seen_permalink = set()
-    seen_title = set()
-    out: List[BubbleItem] = []
-    for b in items:
+def near_dup_index(threshold: float) -> Optional[NearDuplicateIndex]:
+    if not NEAR_DUP_ENABLED:
+        return None
+    return NearDuplicateIndex(threshold, num_perm=NEAR_DUP_NUM_PERM, shingle_size=NEAR_DUP_SHINGLE_SIZE)
+
+class BubbleDeduper:
+    """
+    Dedupe incremental: `accept` diz se o post é novo (e o registra); `forget` libera
+    o registro de um post que saiu do conjunto (ex.: desalojado do top-K), para o
+    estado acompanhar só os posts mantidos.
+    """
+
+    def __init__(self):
+        self.seen_permalink = set()
+        self.seen_title = set()
+        self.similar_titles = near_dup_index(NEAR_DUP_TITLE_THRESHOLD)
+        self.accepted = 0
+
+    def accept(self, b: BubbleItem) -> bool:
         pk = safe_text(b.permalink)
         tk = norm_key(b.title)
-        if pk and pk in seen_permalink:
-            continue
-        if tk and tk in seen_title:
-            continue
+        if pk and pk in self.seen_permalink:
+            return False
+        if tk and tk in self.seen_title:
+            return False
+        # repost com título levemente editado
+        if self.similar_titles is not None and not self.similar_titles.add_if_new(b.id, b.title):
+            return False
         if pk:
-            seen_permalink.add(pk)
+            self.seen_permalink.add(pk)
         if tk:
-            seen_title.add(tk)
-        out.append(b)
-    return out
+            self.seen_title.add(tk)
+        self.accepted += 1
+        return True
+
+    def forget(self, b: BubbleItem) -> None:
+        self.seen_permalink.discard(safe_text(b.permalink))
+        self.seen_title.discard(norm_key(b.title))
+        if self.similar_titles is not None:
+            self.similar_titles.remove(b.id)
+
+def dedupe_bubbles(items: List[BubbleItem]) -> List[BubbleItem]:
+    deduper = BubbleDeduper()
+    return [b for b in items if deduper.accept(b)]
 
 def pick_representative(cluster: BubbleCluster) -> BubbleItem:
     # escolhe o item com maior relevanceScore; fallback rawScore
     best = sorted(cluster.items, key=lambda x: (x.relevanceScore, x.rawScore), reverse=True)[0]
     return best
 
-def merge_cluster_comments(cluster: BubbleCluster) -> List[Dict[str, Any]]:
-    """
-    Agrega comentários de múltiplos posts do cluster para enriquecer melhor o “assunto”.
-    Mantém cap e dedupe por texto.
-    """
+def cluster_comment_posts(cluster: BubbleCluster) -> List[BubbleItem]:
     # usa os melhores posts do cluster (maior score) para puxar comentários
-    items_sorted = sorted(cluster.items, key=lambda x: x.rawScore, reverse=True)[:CLUSTER_MAX_POSTS_TO_MERGE]
+    return sorted(cluster.items, key=lambda x: x.rawScore, reverse=True)[:CLUSTER_MAX_POSTS_TO_MERGE]
 
+def fetch_post_comments(it: BubbleItem) -> List[Dict[str, Any]]:
+    try:
+        post_id = it.id.replace("reddit_", "", 1)
+        return fetch_top_comments(post_id, it.subreddit, MAX_COMMENTS_PER_POST)
+    except Exception:
+        return []
+
+def merge_comment_lists(per_post: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Junta as listas de comentários (na ordem dos posts) com dedupe por texto e cap.
+    """
     merged: List[Dict[str, Any]] = []
     seen_text = set()
+    similar_text = near_dup_index(NEAR_DUP_COMMENT_THRESHOLD)
 
-    for it in items_sorted:
-        try:
-            post_id = it.id.replace("reddit_", "", 1)
-            comments = fetch_top_comments(post_id, it.subreddit, MAX_COMMENTS_PER_POST)
-        except Exception:
-            comments = []
-
-        # dedupe por texto normalizado
+    for comments in per_post:
+        # dedupe por texto normalizado (exato) e por quase-duplicata (copia/cola com edição)
         for c in comments:
             t = norm_key(c.get("text", ""))
             if not t or t in seen_text:
                 continue
+            if similar_text is not None and not similar_text.add_if_new(len(merged), t):
+                continue
             seen_text.add(t)
             merged.append(c)
 
-        time.sleep(SLEEP_BETWEEN_POSTS_COMMENTS)
-
         if len(merged) >= CLUSTER_MAX_TOTAL_COMMENTS:
             break
 
@@ -573,82 +1638,402 @@ def merge_cluster_comments(cluster: BubbleCluster) -> List[Dict[str, Any]]:
     merged.sort(key=lambda x: int(x.get("score", 0) or 0), reverse=True)
     return merged[:CLUSTER_MAX_TOTAL_COMMENTS]
 
-def enrich_clusters(clusters: List[BubbleCluster]) -> List[BubbleItem]:
+def merge_cluster_comments(cluster: BubbleCluster) -> List[Dict[str, Any]]:
+    """
+    Agrega comentários de múltiplos posts do cluster para enriquecer melhor o “assunto”.
+    Mantém cap e dedupe por texto.
+    """
+    per_post: List[List[Dict[str, Any]]] = []
+
+    for it in cluster_comment_posts(cluster):
+        comments = fetch_post_comments(it)
+        per_post.append(comments)
+
+        time.sleep(SLEEP_BETWEEN_POSTS_COMMENTS)
+
+        # mesmo corte do merge: só para de buscar quando o cap já foi atingido
+        if len(merge_comment_lists(per_post)) >= CLUSTER_MAX_TOTAL_COMMENTS:
+            break
+
+    return merge_comment_lists(per_post)
+
+def fetch_clusters_comments(clusters: List[BubbleCluster]) -> List[List[Dict[str, Any]]]:
+    """
+    Busca os comentários de todos os clusters num pool de threads limitado
+    (cap por host + token bucket). O merge/dedupe por cluster é o mesmo do fluxo serial.
+    """
+    bucket = TokenBucket(COMMENTS_RATE_PER_SEC, COMMENTS_MAX_PER_HOST)
+    limiter = HostLimiter(COMMENTS_MAX_PER_HOST)
+
+    def task(it: BubbleItem) -> List[Dict[str, Any]]:
+        with limiter.slot(REDDIT_BASE):
+            bucket.acquire()
+            return fetch_post_comments(it)
+
+    targets = [cluster_comment_posts(c) for c in clusters]
+    with ThreadPoolExecutor(max_workers=max(1, COMMENTS_MAX_WORKERS)) as pool:
+        futures = [[pool.submit(task, it) for it in posts] for posts in targets]
+        return [merge_comment_lists([f.result() for f in fs]) for fs in futures]
+
+def apply_enrichment(rep: BubbleItem, result: Dict[str, Any]) -> None:
+    if result.get("title"):
+        rep.title = safe_text(result["title"])
+    rep.label = safe_text(result.get("label", ""))
+    rep.context = safe_text(result.get("context", ""))
+    rep.opinions = result.get("opinions") or []
+
+EMPTY_ENRICHMENT: Dict[str, Any] = {"title": "", "label": "", "context": "", "opinions": []}
+
+def enrich_clusters(
+    clusters: List[BubbleCluster],
+    state: Optional[ClusterStateStore] = None,
+    on_done: Optional[Callable[[BubbleItem], None]] = None,
+) -> List[BubbleItem]:
     """
     Enriquecemos 1 bolha por cluster (representante),
     mas o LLM recebe comentários agregados de vários posts daquele cluster.
+    A saída mantém a ordem de `clusters`, mesmo com as chamadas em paralelo.
+    Com `state`, clusters sem mudança relevante reaproveitam o último enriquecimento.
+    `on_done` recebe cada representante assim que ele fica pronto (ordem de conclusão).
     """
-    out: List[BubbleItem] = []
+    prefetched: Optional[List[List[Dict[str, Any]]]] = None
+    if PARALLEL_COMMENTS:
+        print(f"💬 Buscando comentários de {len(clusters)} clusters em paralelo...")
+        try:
+            with metrics.stage("comments"):
+                prefetched = fetch_clusters_comments(clusters)
+        except Exception as e:
+            print(f"[WARN] Falha na busca paralela de comentários: {e}")
+            prefetched = None
+
+    reps: List[BubbleItem] = []
+    comments_per_cluster: List[List[Dict[str, Any]]] = []
     for idx, c in enumerate(clusters, start=1):
         rep = pick_representative(c)
+        # `clusters` chega ranqueado: rank/tamanho são do cluster, antes do stream gravar a linha
+        rep.rank = idx
+        rep.relevanceScore = c.relevanceScore
+        rep.suggestedRadius = suggested_radius(c.relevanceScore)
         rep.image = select_cluster_image(c)
-
-        print(f"({idx}/{len(clusters)}) Enriquecendo cluster: {rep.title[:80]}  |  posts={len(c.items)}")
+        reps.append(rep)
 
         comments = []
         try:
-            comments = merge_cluster_comments(c)
+            if prefetched is not None:
+                comments = prefetched[idx - 1]
+            else:
+                with metrics.stage("comments"):
+                    comments = merge_cluster_comments(c)
         except Exception as e:
             print(f"[WARN] Falha ao agregar comentários do cluster: {e}")
             comments = []
+        comments_per_cluster.append(comments)
 
+    def enrich_one(idx: int, limiter: Optional[AdaptiveLimiter]) -> Dict[str, Any]:
+        rep, c = reps[idx], clusters[idx]
+        print(f"({idx + 1}/{len(clusters)}) Enriquecendo cluster: {rep.title[:80]}  |  posts={len(c.items)}")
         try:
-            result = generate_context_and_opinions(rep.title, rep.subreddit, comments)
+            if limiter is not None:
+                return generate_with_backoff(limiter, rep.title, rep.subreddit, comments_per_cluster[idx], stats_key=rep.id)
+            return generate_context_and_opinions(rep.title, rep.subreddit, comments_per_cluster[idx], stats_key=rep.id)
         except Exception as e:
             print(f"[WARN] Falha OpenAI: {e}")
-            result = {"title": "", "label": "", "context": "", "opinions": []}
+            return dict(EMPTY_ENRICHMENT)
+
+    def finish(i: int, result: Dict[str, Any], generated: bool) -> None:
+        # roda na thread principal, na ordem em que os clusters ficam prontos
+        if generated and state is not None and result.get("label"):
+            state.record(reps[i].id, [it.id for it in clusters[i].items], comments_per_cluster[i], result)
+            state.regenerated += 1
+        apply_enrichment(reps[i], result or EMPTY_ENRICHMENT)
+        if on_done is not None:
+            on_done(reps[i])
+
+    with metrics.stage("llm"):
+        pending: List[int] = []
+        for i, (rep, c) in enumerate(zip(reps, clusters)):
+            saved = state.lookup(rep.id, [it.id for it in c.items], comments_per_cluster[i]) if state is not None else None
+            if saved is None:
+                pending.append(i)
+                continue
+            print(f"({i + 1}/{len(clusters)}) Reutilizando cluster: {rep.title[:80]}")
+            state.reused += 1
+            finish(i, saved, generated=False)
+
+        if BATCH_LLM and pending:
+            try:
+                batched = generate_batch(
+                    [(reps[i].title, reps[i].subreddit, comments_per_cluster[i]) for i in pending],
+                    stats_keys=[reps[i].id for i in pending],
+                )
+            except Exception as e:
+                print(f"[WARN] Falha no lote OpenAI: {e}")
+                batched = [None] * len(pending)
+            missing: List[int] = []
+            for i, result in zip(pending, batched):
+                if result is None:
+                    missing.append(i)
+                else:
+                    finish(i, result, generated=True)
+            if missing:
+                print(f"[WARN] {len(missing)} clusters sem resultado do lote; usando chamadas interativas")
+            pending = missing
+
+        if PACK_SIZE > 1 and len(pending) > 1:
+            packs = [pending[k : k + PACK_SIZE] for k in range(0, len(pending), PACK_SIZE)]
+
+            def enrich_pack(pack: List[int], limiter: Optional[AdaptiveLimiter]) -> List[Optional[Dict[str, Any]]]:
+                jobs = [(reps[i].title, reps[i].subreddit, comments_per_cluster[i]) for i in pack]
+                keys = [reps[i].id for i in pack]
+                print(f"📦 Enriquecendo {len(pack)} clusters numa chamada: {', '.join(str(i + 1) for i in pack)}")
+                try:
+                    if limiter is not None:
+                        return call_with_backoff(limiter, lambda llm: generate_packed(jobs, llm=llm, stats_keys=keys))
+                    return generate_packed(jobs, stats_keys=keys)
+                except Exception as e:
+                    print(f"[WARN] Falha OpenAI (pacote): {e}")
+                    return [None] * len(pack)
+
+            failed: List[int] = []
+
+            def finish_pack(pack: List[int], packed: List[Optional[Dict[str, Any]]]) -> None:
+                for i, result in zip(pack, packed):
+                    if result is None:
+                        failed.append(i)
+                    else:
+                        finish(i, result, generated=True)
+
+            if PARALLEL_LLM and len(packs) > 1:
+                limiter = AdaptiveLimiter(LLM_INITIAL_IN_FLIGHT, LLM_MAX_IN_FLIGHT)
+                with ThreadPoolExecutor(max_workers=max(1, LLM_MAX_IN_FLIGHT)) as pool:
+                    futures = {pool.submit(enrich_pack, pack, limiter): pack for pack in packs}
+                    for f in as_completed(futures):
+                        finish_pack(futures[f], f.result())
+            else:
+                for pack in packs:
+                    finish_pack(pack, enrich_pack(pack, None))
+
+            if failed:
+                print(f"[WARN] {len(failed)} clusters inválidos nos pacotes; reenviando individualmente")
+            pending = sorted(failed)
+
+        if PARALLEL_LLM and len(pending) > 1:
+            limiter = AdaptiveLimiter(LLM_INITIAL_IN_FLIGHT, LLM_MAX_IN_FLIGHT)
+            with ThreadPoolExecutor(max_workers=max(1, LLM_MAX_IN_FLIGHT)) as pool:
+                futures = {pool.submit(enrich_one, i, limiter): i for i in pending}
+                for f in as_completed(futures):
+                    finish(futures[f], f.result(), generated=True)
+            print(f"⚙️  Limite final de chamadas simultâneas ao modelo: {limiter.limit:.1f}")
+        else:
+            for i in pending:
+                finish(i, enrich_one(i, None), generated=True)
 
-        # aplica resultado ao representante
-        if result.get("title"):
-            rep.title = safe_text(result["title"])
-        rep.label = safe_text(result.get("label", ""))
-        rep.context = safe_text(result.get("context", ""))
-        rep.opinions = result.get("opinions") or []
+    return reps
 
-        out.append(rep)
+# =========================
+# OUTPUT
+# =========================
 
-    return out
+def bubble_to_dict(b: BubbleItem) -> Dict[str, Any]:
+    return {
+        "id": b.id,
+        "rank": b.rank,
+        "title": b.title,
+        "label": b.label,
+        "context": b.context,
+        "source": b.source,
+        "subreddit": b.subreddit,
+        "permalink": b.permalink,
+        "createdAt": b.createdAt,
+        "rawScore": b.rawScore,
+        "relevanceScore": b.relevanceScore,
+        "suggestedRadius": b.suggestedRadius,
+        "imageUrl": b.image,
+        "opinions": b.opinions or [],
+    }
+
+class NDJSONStream:
+    """
+    Saída incremental: uma bolha por linha (JSON), gravada e "flushed" assim que
+    o cluster termina de enriquecer. O arquivo é truncado ao abrir (uma execução por arquivo).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._f = open(path, "w", encoding="utf-8")
+
+    def write(self, b: BubbleItem) -> None:
+        line = json.dumps(bubble_to_dict(b), ensure_ascii=False)
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._f.close()
+
+def read_ndjson(path: str) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                # linha truncada (execução interrompida no meio da escrita)
+                continue
+    return items
+
+def write_feed(items: List[Dict[str, Any]], path: str = OUTPUT_FILE, version: Optional[int] = None) -> Dict[str, Any]:
+    items = sorted(items, key=lambda x: x.get("rank", 0))
+    doc: Dict[str, Any] = {"generatedAt": now_utc().isoformat()}
+    if version is not None:
+        doc["version"] = version
+    doc["count"] = len(items)
+    doc["items"] = items
+    write_atomic(path, dumps(doc, pretty=not FEED_COMPACT))
+    return doc
+
+def write_feed_delta(snapshots: FeedSnapshotStore, doc: Dict[str, Any]) -> None:
+    """Delta (ou snapshot) do feed recém-gravado em FEED_DELTA_FILE; `doc` vira a nova base."""
+    delta, full_bytes = snapshots.build(doc, os.path.basename(OUTPUT_FILE))
+    data = dumps(delta)
+    write_atomic(FEED_DELTA_FILE, data)
+    snapshots.commit(doc, delta)
+    print(delta_stats_line(delta, len(data), full_bytes))
+
+def write_feed_outputs(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Feed final (+ delta e shards, se ligados) a partir das bolhas já enriquecidas."""
+    snapshots = FeedSnapshotStore(FEED_SNAPSHOT_FILE, FEED_DELTA_MAX_FRACTION) if FEED_DELTA else None
+    version = snapshots.next_version if snapshots is not None else None
+    doc = write_feed(items, version=version)
+    if snapshots is not None:
+        write_feed_delta(snapshots, doc)
+    if FEED_SHARDS:
+        written = write_feed_shards(doc, FEED_SHARDS_DIR)
+        print(f"🧩 Índice ({written['index']} bytes) + {written['files']} detalhes em {FEED_SHARDS_DIR}/")
+    return doc
+
+def rebuild_feed_from_stream(path: str = STREAM_FILE) -> Dict[str, Any]:
+    """
+    Recuperação: monta o feed do NDJSON de uma execução interrompida (as bolhas que
+    chegaram a ser gravadas; uma última linha truncada é ignorada).
+    """
+    items = read_ndjson(path)
+    print(f"♻️  {len(items)} bolhas recuperadas de {path}")
+    return write_feed_outputs(items)
+
+def export_metrics() -> None:
+    print(metrics.stats_line())
+    if not METRICS_ENABLED:
+        return
+    try:
+        metrics.write_json(METRICS_JSON_FILE)
+        metrics.write_prometheus(METRICS_PROM_FILE)
+    except Exception as e:
+        print(f"[WARN] Falha ao gravar métricas: {e}")
+
+def open_state_store() -> Optional[ClusterStateStore]:
+    if not INCREMENTAL:
+        return None
+    return ClusterStateStore(
+        STATE_FILE,
+        min_member_overlap=STATE_MIN_MEMBER_OVERLAP,
+        min_comment_overlap=STATE_MIN_COMMENT_OVERLAP,
+        max_age_seconds=STATE_MAX_AGE_SECONDS,
+    )
 
 def main():
-    if not OPENAI_API_KEY:
-        raise RuntimeError("OPENAI_API_KEY não encontrada.")
+    # métricas são exportadas mesmo em saídas antecipadas ou falhas
+    try:
+        run_pipeline()
+    finally:
+        export_metrics()
 
+def collect_bubbles() -> List[BubbleItem]:
+    """Coleta + dedupe + normalização; posts ordenados por relevância."""
     print("🔎 Coletando posts do Reddit...")
-    bubbles = build_bubbles_from_reddit()
-    bubbles = dedupe_bubbles(bubbles)
+    if STREAMING_RANK:
+        return collect_bubbles_streaming()
 
-    if not bubbles:
-        print("Nenhum post relevante encontrado.")
-        return
+    with metrics.stage("fetch"):
+        bubbles = build_bubbles_from_reddit()
+    with metrics.stage("dedupe"):
+        bubbles = dedupe_bubbles(bubbles)
 
     # normaliza scores em nível de post
     normalize_scores(bubbles)
     bubbles.sort(key=lambda x: x.relevanceScore, reverse=True)
+    return bubbles
 
+def collect_bubbles_streaming() -> List[BubbleItem]:
+    """
+    Mesmo resultado de collect_bubbles sem guardar o corpus: cada post passa pelo dedupe
+    assim que chega e entra no top-K por rawScore (RANK_MAX_CANDIDATES). O min/max da
+    normalização é o de todos os posts vistos, então os candidatos recebem o mesmo
+    relevanceScore (e a mesma ordem) da passada completa. Com até RANK_MAX_CANDIDATES
+    posts, a saída é idêntica; acima disso, os posts de menor score ficam de fora: a
+    ordem dos clusters formados pelos candidatos se mantém, mas eles perdem os membros
+    descartados e o score do cluster é normalizado só entre os clusters dos candidatos.
+
+    O dedupe também só guarda os candidatos (quem sai do top-K sai do dedupe), então a
+    memória fica em O(RANK_MAX_CANDIDATES), não O(corpus). Acima do limite isso é
+    mais uma diferença: um repost (título quase igual) de um post já descartado pode
+    entrar se tiver score para isso; a passada completa o descartaria. Um post repetido
+    (mesmo score) nunca volta, porque o piso do top-K só sobe.
+    """
+    deduper = BubbleDeduper()
+    ranker: StreamingTopK[BubbleItem] = StreamingTopK(RANK_MAX_CANDIDATES, lambda b: b.rawScore)
+
+    def sink(batch: List[BubbleItem]) -> None:
+        with metrics.stage("dedupe"):
+            for b in batch:
+                if deduper.accept(b):
+                    out = ranker.push(b)
+                    if out is not None:
+                        deduper.forget(out)
+
+    # dedupe e ranking acontecem durante a coleta; "fetch" desconta o tempo do "dedupe"
+    with metrics.stage("fetch", exclude="dedupe"):
+        stream_bubbles_from_reddit(sink)
+
+    bubbles = ranker.items()
+    if bubbles:
+        normalize_scores(bubbles, (ranker.min, ranker.max))
+    bubbles.sort(key=lambda x: x.relevanceScore, reverse=True)
+    print(ranker.stats_line())
+    return bubbles
+
+def rank_clusters(bubbles: List[BubbleItem]) -> List[BubbleCluster]:
+    """
+    Clusteriza, pontua os clusters e devolve os TOP_N, com o representante de cada
+    um já com rank/relevanceScore/suggestedRadius do cluster.
+    """
     # clusteriza usando uma janela maior (melhor para reduzir repetição)
     # (não corta antes, para permitir formar clusters)
     print(f"🧩 Clusterizando {len(bubbles)} posts...")
-    clusters = cluster_bubbles(bubbles)
+    with metrics.stage("cluster"):
+        clusters = cluster_bubbles(bubbles)
 
     if not clusters:
-        print("Nenhum cluster criado.")
-        return
+        return []
 
     # calcula relevanceScore do cluster por normalização do rawScore do cluster
     cluster_raws = [c.rawScore for c in clusters]
     mn = min(cluster_raws)
     mx = max(cluster_raws)
     for c in clusters:
-        if mx - mn < 1e-9:
-            c.relevanceScore = 0.5
-        else:
-            c.relevanceScore = (c.rawScore - mn) / (mx - mn)
+        c.relevanceScore = scale_score(c.rawScore, mn, mx)
 
     clusters.sort(key=lambda c: c.relevanceScore, reverse=True)
     top_clusters = clusters[:TOP_N]
 
-    # monta a lista final de bolhas (representantes) com rank + radius baseados no cluster score
-    reps: List[BubbleItem] = []
+    # representantes com rank + radius baseados no cluster score
     for i, c in enumerate(top_clusters, start=1):
         rep = pick_representative(c)
 
@@ -656,47 +2041,69 @@ def main():
         rep.rank = i
         rep.relevanceScore = c.relevanceScore
         rep.suggestedRadius = suggested_radius(rep.relevanceScore)
-        reps.append(rep)
 
-    print(f"✨ Enriquecendo TOP {len(reps)} clusters (1 bolha por cluster)...")
-    reps = enrich_clusters(top_clusters)
+    return top_clusters
+
+def enrich_and_write(top_clusters: List[BubbleCluster], state: Optional[ClusterStateStore] = None) -> None:
+    """Enriquece os clusters (já ranqueados por rank_clusters) e grava o feed."""
+    if not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY não encontrada.")
 
-    # garante rank/radius após enrich (caso rep tenha sido reusado internamente)
-    for i, b in enumerate(reps, start=1):
-        b.rank = i
-        b.suggestedRadius = suggested_radius(b.relevanceScore)
+    if state is None:
+        state = open_state_store()
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "generatedAt": now_utc().isoformat(),
-                "count": len(reps),
-                "items": [
-                    {
-                        "id": b.id,
-                        "rank": b.rank,
-                        "title": b.title,
-                        "label": b.label,
-                        "context": b.context,
-                        "source": b.source,
-                        "subreddit": b.subreddit,
-                        "permalink": b.permalink,
-                        "createdAt": b.createdAt,
-                        "rawScore": b.rawScore,
-                        "relevanceScore": b.relevanceScore,
-                        "suggestedRadius": b.suggestedRadius,
-                        "imageUrl": b.image,
-                        "opinions": b.opinions or [],
-                    }
-                    for b in reps
-                ],
-            },
-            f,
-            ensure_ascii=False,
-            indent=2,
-        )
+    # rank/radius já são conhecidos antes do enrich: cada linha do stream sai completa
+    stream = NDJSONStream(STREAM_FILE) if STREAM_OUTPUT else None
+    if stream is not None:
+        print(f"📡 Streaming das bolhas em {STREAM_FILE}")
+
+    print(f"✨ Enriquecendo TOP {len(top_clusters)} clusters (1 bolha por cluster)...")
+    try:
+        reps = enrich_clusters(top_clusters, state, on_done=stream.write if stream is not None else None)
+    finally:
+        if stream is not None:
+            stream.close()
+
+    # com stream, o feed final sai do NDJSON (o mesmo caminho da recuperação de uma
+    # execução interrompida: rebuild_feed_from_stream / `bubbles_cli.py recover`)
+    with metrics.stage("output"):
+        if stream is not None:
+            write_feed_outputs(read_ndjson(STREAM_FILE))
+        else:
+            write_feed_outputs([bubble_to_dict(b) for b in reps])
 
     print("✅ bubbles_enriched.json gerado (títulos PT + cluster + agregação)")
+    if state is not None:
+        state.save()
+        print(state.stats_line())
+    if http_cache is not None:
+        print(http_cache.stats_line())
+    if llm_cache is not None:
+        print(llm_cache.stats_line())
+    print(prompt_stats.stats_line(exact=get_token_counter().exact))
+    print(structured_output.stats_line(metrics.summary()["counters"]))
+
+def run_pipeline(state: Optional[ClusterStateStore] = None) -> bool:
+    """
+    Uma execução completa (coleta → cluster → enrich → feed).
+    `state` permite reaproveitar o estado incremental já carregado (modo daemon).
+    Retorna True quando o feed foi gravado.
+    """
+    if not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY não encontrada.")
+
+    bubbles = collect_bubbles()
+    if not bubbles:
+        print("Nenhum post relevante encontrado.")
+        return False
+
+    top_clusters = rank_clusters(bubbles)
+    if not top_clusters:
+        print("Nenhum cluster criado.")
+        return False
+
+    enrich_and_write(top_clusters, state)
+    return True
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,109 @@
+"""
+Estado persistente entre execuções (JSON) para enriquecimento incremental.
+
+Para cada cluster (chave = id do representante) guarda os ids dos posts membros,
+o fingerprint/ids dos comentários agregados e o último enriquecimento (title,
+label, context, opinions). Numa nova execução, clusters cujas entradas não
+mudaram de forma relevante reaproveitam o enriquecimento sem chamar o LLM.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def comments_fingerprint(comments: List[Dict[str, Any]]) -> str:
+    ids = sorted(str(c.get("id") or "") for c in comments)
+    return hashlib.sha256("|".join(ids).encode("utf-8")).hexdigest()
+
+
+def jaccard(a: Iterable[str], b: Iterable[str]) -> float:
+    sa, sb = set(a), set(b)
+    if not sa and not sb:
+        return 1.0
+    return len(sa & sb) / len(sa | sb)
+
+
+class ClusterStateStore:
+    def __init__(
+        self,
+        path: str,
+        min_member_overlap: float = 0.5,
+        min_comment_overlap: float = 0.7,
+        max_age_seconds: float = 12 * 3600,
+        forget_after_seconds: float = 3 * 24 * 3600,
+    ):
+        self.path = path
+        self.min_member_overlap = min_member_overlap
+        self.min_comment_overlap = min_comment_overlap
+        self.max_age_seconds = max_age_seconds
+        self.forget_after_seconds = forget_after_seconds
+
+        self.reused = 0
+        self.regenerated = 0
+        self.clusters: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.clusters = json.load(f).get("clusters", {})
+            except Exception as e:
+                print(f"[WARN] Estado incremental ilegível ({path}): {e}")
+                self.clusters = {}
+
+    def lookup(
+        self,
+        key: str,
+        member_ids: List[str],
+        comments: List[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """Retorna o enriquecimento salvo se o cluster não mudou de forma relevante."""
+        entry = self.clusters.get(key)
+        if not entry or not entry.get("enrichment"):
+            return None
+        if time.time() - float(entry.get("enrichedAt", 0.0)) > self.max_age_seconds:
+            return None
+        if jaccard(entry.get("memberIds", []), member_ids) < self.min_member_overlap:
+            return None
+
+        if entry.get("commentsFingerprint") != comments_fingerprint(comments):
+            new_ids = [str(c.get("id") or "") for c in comments]
+            if jaccard(entry.get("commentIds", []), new_ids) < self.min_comment_overlap:
+                return None
+
+        entry["lastSeen"] = time.time()
+        return entry["enrichment"]
+
+    def record(
+        self,
+        key: str,
+        member_ids: List[str],
+        comments: List[Dict[str, Any]],
+        enrichment: Dict[str, Any],
+    ) -> None:
+        now = time.time()
+        self.clusters[key] = {
+            "memberIds": sorted(member_ids),
+            "commentIds": sorted(str(c.get("id") or "") for c in comments),
+            "commentsFingerprint": comments_fingerprint(comments),
+            "enrichment": enrichment,
+            "enrichedAt": now,
+            "lastSeen": now,
+        }
+
+    def save(self) -> None:
+        now = time.time()
+        self.clusters = {
+            k: v
+            for k, v in self.clusters.items()
+            if now - float(v.get("lastSeen", 0.0)) <= self.forget_after_seconds
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"savedAt": now, "clusters": self.clusters}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def stats_line(self) -> str:
+        return f"♻️  Incremental: reutilizados={self.reused} regenerados={self.regenerated}"
@@ -4,6 +4,8 @@ from typing import Dict
 
 from openai import OpenAI
 
+from llm_cache import LLMCache
+
 # =========================
 # CONFIGURAÇÃO
 # =========================
@@ -16,6 +18,14 @@ INPUT_FILE = "bubbles.json"
 OUTPUT_FILE = "bubbles_enriched.json"
 
 MODEL = "gpt-4.1-mini"
+TEMPERATURE = 0.1
+
+# Cache persistente das respostas (mesmo arquivo do bubbles_engine; chaves não colidem)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_FILE = "llm_cache.sqlite"
+LLM_CACHE_TTL_SECONDS = 24 * 3600
+
+llm_cache = LLMCache(LLM_CACHE_FILE, LLM_CACHE_TTL_SECONDS) if LLM_CACHE_ENABLED else None
 
 # =========================
 # PROMPTS
@@ -102,24 +112,34 @@ def parse_structured_text(text: str) -> Dict[str, str]:
 
 
 def generate_label_and_context(title: str, subreddit: str) -> Dict[str, str]:
+    system_prompt = SYSTEM_PROMPT.strip()
+    user_prompt = USER_PROMPT_TEMPLATE.format(
+        title=title,
+        subreddit=subreddit,
+    ).strip()
+
+    cache_key = ""
+    if llm_cache is not None:
+        cache_key = LLMCache.make_key(MODEL, TEMPERATURE, system_prompt, user_prompt)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     response = client.chat.completions.create(
         model=MODEL,
         messages=[
-            {"role": "system", "content": SYSTEM_PROMPT.strip()},
-            {
-                "role": "user",
-                "content": USER_PROMPT_TEMPLATE.format(
-                    title=title,
-                    subreddit=subreddit,
-                ).strip(),
-            },
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
         ],
-        temperature=0.1,
+        temperature=TEMPERATURE,
         max_tokens=200,
     )
 
     raw = response.choices[0].message.content.strip()
-    return parse_structured_text(raw)
+    result = parse_structured_text(raw)
+    if llm_cache is not None and result["label"] and result["context"]:
+        llm_cache.put(cache_key, result)
+    return result
 
 
 def main():
@@ -161,6 +181,8 @@ def main():
         json.dump(output, f, ensure_ascii=False, indent=2)
 
     print(f"\n✅ Arquivo gerado com sucesso: {OUTPUT_FILE}")
+    if llm_cache is not None:
+        print(llm_cache.stats_line())
 
 
 if __name__ == "__main__":
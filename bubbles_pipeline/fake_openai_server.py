@@ -0,0 +1,341 @@
+"""
+Servidor local compatível com a API da OpenAI (apenas o necessário para o pipeline).
+
+Serve POST /v1/chat/completions com latência configurável e injeção de
+rate limit (429 + Retry-After), para exercitar o enriquecimento concorrente
+sem gastar chamadas reais. Prompts empacotados (blocos "=== CLUSTER <id> ===")
+recebem um array JSON com um objeto por cluster. Também simula a Batch API (/v1/files e /v1/batches):
+o lote fica "in_progress" por --batch-latency segundos e então é processado de uma vez.
+
+Uso:
+    python fake_openai_server.py --port 8765 --latency 0.8 --max-concurrent 3
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python bubbles_engine.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default as email_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+
+class FakeOpenAIConfig:
+    def __init__(
+        self,
+        latency: float = 0.5,
+        jitter: float = 0.0,
+        rate_limit_prob: float = 0.0,
+        max_concurrent: int = 0,
+        retry_after: Optional[float] = 1.0,
+        batch_latency: float = 2.0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_prob = rate_limit_prob
+        self.max_concurrent = max_concurrent      # 0 = sem limite
+        self.retry_after = retry_after            # None = 429 sem Retry-After
+        self.batch_latency = batch_latency        # s até um lote ficar "completed"
+
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.peak_in_flight = 0
+
+        self.files: Dict[str, Dict[str, Any]] = {}    # id -> {"meta": ..., "content": bytes}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.batch_lines = 0
+
+
+def fake_enrichment(prompt: str) -> Dict[str, Any]:
+    m = re.search(r'TÍTULO \(original\): "(.*)"', prompt)
+    title = m.group(1) if m else "Assunto"
+    return {
+        "title": f"{title} (pt)",
+        "label": title[:40],
+        "context": f"Contexto gerado localmente para: {title}.",
+        "opinions": [
+            {"id": "op1", "tone": "positive", "text": f"A favor: {title}", "source": "reddit"},
+            {"id": "op2", "tone": "negative", "text": f"Contra: {title}", "source": "reddit"},
+            {"id": "op3", "tone": "neutral", "text": f"Ponderado: {title}", "source": "reddit"},
+        ],
+    }
+
+
+def chat_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    messages = body.get("messages") or []
+    prompt = str(messages[-1].get("content", "")) if messages else ""
+    blocks = re.split(r"^=== CLUSTER (\S+) ===$", prompt, flags=re.MULTILINE)
+    if len(blocks) > 1:
+        # prompt empacotado: um objeto por bloco, com o cluster_id do bloco
+        packed = [dict(fake_enrichment(block), cluster_id=cid) for cid, block in zip(blocks[1::2], blocks[2::2])]
+        content = json.dumps(packed, ensure_ascii=False)
+    else:
+        content = json.dumps(fake_enrichment(prompt), ensure_ascii=False)
+    return {
+        "id": f"chatcmpl-fake-{random.randrange(1 << 30)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": 0},
+    }
+
+
+def store_file(cfg: FakeOpenAIConfig, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+    fid = f"file-fake-{random.randrange(1 << 30)}"
+    meta = {
+        "id": fid,
+        "object": "file",
+        "bytes": len(content),
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "status": "processed",
+    }
+    cfg.files[fid] = {"meta": meta, "content": content}
+    return meta
+
+
+def run_batch(cfg: FakeOpenAIConfig, batch: Dict[str, Any]) -> None:
+    """Processa todas as linhas do arquivo de entrada e grava o arquivo de saída."""
+    content = cfg.files[batch["input_file_id"]]["content"].decode("utf-8")
+    out = []
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        req = json.loads(line)
+        out.append(
+            json.dumps(
+                {
+                    "id": f"batch_req_{random.randrange(1 << 30)}",
+                    "custom_id": req.get("custom_id"),
+                    "response": {"status_code": 200, "request_id": "", "body": chat_completion(req.get("body") or {})},
+                    "error": None,
+                },
+                ensure_ascii=False,
+            )
+        )
+    cfg.batch_lines += len(out)
+    meta = store_file(cfg, ("\n".join(out) + "\n").encode("utf-8"), "batch_output.jsonl", "batch_output")
+    now = int(time.time())
+    batch.update(
+        status="completed",
+        output_file_id=meta["id"],
+        in_progress_at=batch.get("in_progress_at") or now,
+        completed_at=now,
+        request_counts={"total": len(out), "completed": len(out), "failed": 0},
+    )
+
+
+def make_handler(cfg: FakeOpenAIConfig):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+            raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _read_json(self) -> Dict[str, Any]:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _not_found(self) -> None:
+            self._send_json(404, {"error": {"message": f"rota desconhecida: {self.path}"}})
+
+        def _upload_file(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length)
+            header = f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode("utf-8")
+            msg = BytesParser(policy=email_policy).parsebytes(header + raw)
+            fields: Dict[str, Any] = {}
+            filename = "upload.jsonl"
+            for part in msg.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                fields[name] = part.get_payload(decode=True) or b""
+                if name == "file":
+                    filename = part.get_filename() or filename
+            with cfg.lock:
+                cfg.requests += 1
+                meta = store_file(cfg, fields.get("file", b""), filename, fields.get("purpose", b"").decode("utf-8"))
+            self._send_json(200, meta)
+
+        def _create_batch(self) -> None:
+            body = self._read_json()
+            with cfg.lock:
+                cfg.requests += 1
+                if body.get("input_file_id") not in cfg.files:
+                    self._send_json(400, {"error": {"message": "input_file_id inválido"}})
+                    return
+                bid = f"batch_fake_{random.randrange(1 << 30)}"
+                batch = {
+                    "id": bid,
+                    "object": "batch",
+                    "endpoint": body.get("endpoint", "/v1/chat/completions"),
+                    "completion_window": body.get("completion_window", "24h"),
+                    "input_file_id": body["input_file_id"],
+                    "output_file_id": None,
+                    "error_file_id": None,
+                    "status": "in_progress",
+                    "created_at": int(time.time()),
+                    "in_progress_at": int(time.time()),
+                    "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                    "_ready_at": time.monotonic() + cfg.batch_latency,
+                }
+                cfg.batches[bid] = batch
+            self._send_json(200, {k: v for k, v in batch.items() if not k.startswith("_")})
+
+        def do_GET(self) -> None:
+            path = self.path.split("?", 1)[0].rstrip("/")
+            m = re.search(r"/batches/([^/]+)$", path)
+            if m:
+                with cfg.lock:
+                    cfg.requests += 1
+                    batch = cfg.batches.get(m.group(1))
+                    if batch is not None and batch["status"] == "in_progress" and time.monotonic() >= batch["_ready_at"]:
+                        run_batch(cfg, batch)
+                if batch is None:
+                    self._not_found()
+                    return
+                self._send_json(200, {k: v for k, v in batch.items() if not k.startswith("_")})
+                return
+
+            m = re.search(r"/files/([^/]+)/content$", path)
+            if m:
+                with cfg.lock:
+                    cfg.requests += 1
+                    f = cfg.files.get(m.group(1))
+                if f is None:
+                    self._not_found()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(f["content"])))
+                self.end_headers()
+                self.wfile.write(f["content"])
+                return
+
+            self._not_found()
+
+        def do_POST(self) -> None:
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path.endswith("/files"):
+                self._upload_file()
+                return
+            if path.endswith("/batches"):
+                self._create_batch()
+                return
+            m = re.search(r"/batches/([^/]+)/cancel$", path)
+            if m:
+                with cfg.lock:
+                    batch = cfg.batches.get(m.group(1))
+                    if batch is not None and batch["status"] == "in_progress":
+                        batch["status"] = "cancelled"
+                if batch is None:
+                    self._not_found()
+                    return
+                self._send_json(200, {k: v for k, v in batch.items() if not k.startswith("_")})
+                return
+            if not path.endswith("/chat/completions"):
+                self._not_found()
+                return
+
+            body = self._read_json()
+            with cfg.lock:
+                cfg.requests += 1
+                over = cfg.max_concurrent and cfg.in_flight >= cfg.max_concurrent
+                if over or random.random() < cfg.rate_limit_prob:
+                    cfg.rate_limited += 1
+                    limited = True
+                else:
+                    cfg.in_flight += 1
+                    cfg.peak_in_flight = max(cfg.peak_in_flight, cfg.in_flight)
+                    limited = False
+
+            if limited:
+                headers = {}
+                if cfg.retry_after is not None:
+                    headers["Retry-After"] = str(cfg.retry_after)
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    headers,
+                )
+                return
+
+            try:
+                time.sleep(max(0.0, cfg.latency + random.uniform(-cfg.jitter, cfg.jitter)))
+                self._send_json(200, chat_completion(body))
+            finally:
+                with cfg.lock:
+                    cfg.in_flight -= 1
+
+    return Handler
+
+
+def start_fake_openai(
+    cfg: Optional[FakeOpenAIConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Sobe o servidor numa thread daemon e retorna (server, base_url)."""
+    cfg = cfg or FakeOpenAIConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor fake compatível com a OpenAI")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.5)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--rate-limit-prob", type=float, default=0.0)
+    ap.add_argument("--max-concurrent", type=int, default=0)
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    ap.add_argument("--batch-latency", type=float, default=2.0)
+    args = ap.parse_args()
+
+    cfg = FakeOpenAIConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit_prob=args.rate_limit_prob,
+        max_concurrent=args.max_concurrent,
+        retry_after=args.retry_after,
+        batch_latency=args.batch_latency,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cfg))
+    print(f"🧪 Fake OpenAI em http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(
+            f"requests={cfg.requests} rate_limited={cfg.rate_limited} peak_in_flight={cfg.peak_in_flight} "
+            f"batches={len(cfg.batches)} batch_lines={cfg.batch_lines}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Servidor local que imita as rotas do Reddit usadas pelo pipeline, a partir de fixtures.
+
+Serve GET /r/<sub>/hot.json e GET /r/<sub>/comments/<id>.json com os payloads gravados
+em fixtures/ (formato original da API). Para medir escala, gera um corpus sintético
+de `total_posts` posts espalhados por subreddits "bench0000", "bench0001", ...
+(`posts_per_sub` por listagem, paginada pelo cursor `after`): os campos vêm dos posts gravados e os títulos são
+sorteados (Zipf) de um vocabulário com as palavras dos títulos reais. Os comentários
+de cada post são os da fixture, rotacionados por post.
+
+A fixture de comentários do repo é sintética: os textos vêm dos contextos e opiniões
+gerados no bubbles_enriched.json, não de uma thread real (--record grava uma real).
+
+Uso:
+    python fake_reddit_server.py --port 8766 --total-posts 1000 --latency 0.05
+    python fake_reddit_server.py --record worldnews   # regrava as fixtures a partir do Reddit real
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+HOT_FIXTURE = "reddit_hot.json"
+COMMENTS_FIXTURE = "reddit_comments.json"
+
+
+class FakeRedditConfig:
+    def __init__(
+        self,
+        fixtures_dir: str = FIXTURES_DIR,
+        total_posts: int = 1000,
+        posts_per_sub: int = 50,
+        latency: float = 0.0,
+        seed: int = 42,
+    ):
+        self.fixtures_dir = fixtures_dir
+        self.total_posts = total_posts
+        self.posts_per_sub = max(1, posts_per_sub)
+        self.latency = latency
+        self.seed = seed
+
+        with open(os.path.join(fixtures_dir, HOT_FIXTURE), "r", encoding="utf-8") as f:
+            self.hot = json.load(f)
+        with open(os.path.join(fixtures_dir, COMMENTS_FIXTURE), "r", encoding="utf-8") as f:
+            self.comments = json.load(f)
+
+        self.templates: List[Dict[str, Any]] = [c["data"] for c in self.hot["data"]["children"]]
+        self.vocab, self.weights = build_vocab(self.templates, total_posts, seed)
+        self.cum_weights = list(itertools.accumulate(self.weights))  # choices() sem refazer a soma a cada post
+
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def subreddits(self) -> List[str]:
+        n = -(-self.total_posts // self.posts_per_sub)
+        return [f"bench{i:04d}" for i in range(n)]
+
+
+def build_vocab(templates: List[Dict[str, Any]], total_posts: int, seed: int) -> Tuple[List[str], List[float]]:
+    """Palavras dos títulos gravados primeiro (mais frequentes) + sintéticas para escalar."""
+    rng = random.Random(seed)
+    words: List[str] = []
+    seen = set()
+    for t in templates:
+        for w in re.findall(r"[A-Za-zÀ-ÿ]{4,}", t.get("title", "")):
+            w = w.lower()
+            if w not in seen:
+                seen.add(w)
+                words.append(w)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    while len(words) < max(500, total_posts * 3):
+        w = "".join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+        if w not in seen:
+            seen.add(w)
+            words.append(w)
+    weights = [1.0 / (i + 1) ** 1.1 for i in range(len(words))]
+    return words, weights
+
+
+def listing(cfg: FakeRedditConfig, sub: str, limit: int, after: Optional[str] = None) -> Dict[str, Any]:
+    m = re.fullmatch(r"bench(\d+)", sub)
+    if not m:
+        # subreddit "real": a gravação é a única página
+        if after:
+            return {"kind": "Listing", "data": {"after": None, "dist": 0, "children": []}}
+        return {"kind": "Listing", "data": dict(cfg.hot["data"], after=None)}
+    idx = int(m.group(1))
+    sub_start = idx * cfg.posts_per_sub
+    sub_end = min(sub_start + cfg.posts_per_sub, cfg.total_posts)
+    # cursor `after` = fullname do último post entregue (t3_b0000123)
+    am = re.fullmatch(r"t3_b(\d+)", after or "")
+    start = int(am.group(1)) + 1 if am else sub_start
+    count = max(0, min(limit, sub_end - start))
+
+    now = time.time()
+    children = []
+    for k in range(count):
+        tpl = cfg.templates[(start + k) % len(cfg.templates)]
+        pid = f"b{start + k:07d}"
+        rng = random.Random(f"{cfg.seed}:{pid}")  # por post: o mesmo post em qualquer paginação
+        words = rng.choices(cfg.vocab, cum_weights=cfg.cum_weights, k=rng.randint(6, 12))
+        d = dict(tpl)
+        d.update(
+            id=pid,
+            subreddit=sub,
+            title=" ".join(words).capitalize(),
+            score=rng.randint(300, 40000),
+            num_comments=rng.randint(100, 5000),
+            created_utc=now - rng.uniform(600, 24 * 3600),
+            permalink=f"/r/{sub}/comments/{pid}/",
+        )
+        children.append({"kind": "t3", "data": d})
+    next_after = f"t3_b{start + count - 1:07d}" if count and start + count < sub_end else None
+    return {"kind": "Listing", "data": {"after": next_after, "dist": len(children), "children": children}}
+
+
+def comment_thread(cfg: FakeRedditConfig, sub: str, post_id: str) -> List[Any]:
+    post_listing, comments_listing = cfg.comments[0], cfg.comments[1]
+    children = comments_listing["data"]["children"]
+    if not children:
+        return cfg.comments
+    shift = zlib.crc32(post_id.encode("utf-8")) % len(children)
+    rotated = children[shift:] + children[:shift]
+    out = [
+        {"kind": c.get("kind", "t1"), "data": dict(c["data"], id=f"{post_id}_{c['data'].get('id')}")}
+        for c in rotated
+    ]
+    return [post_listing, {"kind": "Listing", "data": {"children": out}}]
+
+
+def record_fixtures(subreddit: str, fixtures_dir: str = FIXTURES_DIR, user_agent: str = "BubblesBench/0.1") -> None:
+    """Grava hot.json de `subreddit` e a thread de comentários do post mais comentado como fixtures."""
+    import requests
+
+    headers = {"User-Agent": user_agent}
+    base = "https://www.reddit.com"
+    hot = requests.get(f"{base}/r/{subreddit}/hot.json", params={"limit": 50}, headers=headers, timeout=20)
+    hot.raise_for_status()
+    hot_data = hot.json()
+    posts = [c["data"] for c in hot_data["data"]["children"] if not c["data"].get("stickied")]
+    if not posts:
+        raise RuntimeError(f"r/{subreddit} sem posts")
+    top = max(posts, key=lambda d: int(d.get("num_comments", 0) or 0))
+    comments = requests.get(
+        f"{base}/r/{subreddit}/comments/{top['id']}.json",
+        params={"sort": "top", "limit": 50},
+        headers=headers,
+        timeout=20,
+    )
+    comments.raise_for_status()
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for name, payload in ((HOT_FIXTURE, hot_data), (COMMENTS_FIXTURE, comments.json())):
+        with open(os.path.join(fixtures_dir, name), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=1)
+    print(f"📼 Fixtures gravadas em {fixtures_dir} (r/{subreddit}, {len(posts)} posts)")
+
+
+def make_handler(cfg: FakeRedditConfig):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _send_json(self, status: int, payload: Any) -> None:
+            raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self) -> None:
+            with cfg.lock:
+                cfg.requests += 1
+            if cfg.latency > 0:
+                time.sleep(cfg.latency)
+
+            url = urlparse(self.path)
+            m = re.fullmatch(r"/r/([^/]+)/hot\.json", url.path)
+            if m:
+                query = parse_qs(url.query)
+                limit = int((query.get("limit") or ["25"])[0])
+                after = (query.get("after") or [None])[0]
+                self._send_json(200, listing(cfg, m.group(1), limit, after))
+                return
+            m = re.fullmatch(r"/r/([^/]+)/comments/([^/]+)\.json", url.path)
+            if m:
+                self._send_json(200, comment_thread(cfg, m.group(1), m.group(2)))
+                return
+            self._send_json(404, {"message": "Not Found", "error": 404})
+
+    return Handler
+
+
+def start_fake_reddit(
+    cfg: Optional[FakeRedditConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Sobe o servidor numa thread daemon e retorna (server, base_url)."""
+    cfg = cfg or FakeRedditConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor fake do Reddit (fixtures + corpus sintético)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--fixtures", default=FIXTURES_DIR)
+    ap.add_argument("--total-posts", type=int, default=1000)
+    ap.add_argument("--posts-per-sub", type=int, default=50)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--record", metavar="SUBREDDIT", help="grava novas fixtures do Reddit real e sai")
+    args = ap.parse_args()
+
+    if args.record:
+        record_fixtures(args.record, args.fixtures)
+        return
+
+    cfg = FakeRedditConfig(
+        fixtures_dir=args.fixtures,
+        total_posts=args.total_posts,
+        posts_per_sub=args.posts_per_sub,
+        latency=args.latency,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cfg))
+    print(f"🧪 Fake Reddit em http://{args.host}:{args.port} ({len(cfg.subreddits)} subreddits)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"requests={cfg.requests}")
+
+
+if __name__ == "__main__":
+    main()
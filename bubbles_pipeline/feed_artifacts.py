@@ -0,0 +1,170 @@
+"""
+Serialização do feed e artefatos pré-comprimidos para hospedagem estática.
+
+`dumps` gera o JSON compacto em bytes (orjson quando instalado; senão o json da
+stdlib com separadores mínimos). `build_artifacts` grava, num diretório, o feed com
+nome endereçado pelo conteúdo e seus irmãos já comprimidos:
+
+    <stem>.<hash>.json      JSON compacto
+    <stem>.<hash>.json.gz   gzip nível 9 (mtime zerado: mesmo conteúdo → mesmos bytes)
+    <stem>.<hash>.json.br   brotli qualidade 11 (se o pacote brotli estiver instalado)
+    <stem>.manifest.json    nomes, tamanhos e sha256 da versão atual
+
+Como o nome muda quando o conteúdo muda, os arquivos com hash podem ser servidos com
+cache imutável; só o manifest é revalidado. O host não precisa comprimir nada na hora.
+orjson e brotli são opcionais e importados só quando usados.
+
+`write_feed_shards` divide o feed em um índice leve (só os campos do mapa da home)
+e um arquivo de detalhe por bolha (contexto, opiniões e o resto do item):
+
+    <dir>/index.json            {"generatedAt", "count", "items": [campos do mapa + "detail"]}
+    <dir>/details/<id>.json     item completo
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from importlib.util import find_spec
+from typing import Any, Dict, List
+
+ORJSON_AVAILABLE = find_spec("orjson") is not None
+BROTLI_AVAILABLE = find_spec("brotli") is not None
+
+HASH_LENGTH = 12        # hex do sha256 no nome do arquivo
+GZIP_LEVEL = 9          # comprime uma vez, serve muitas: vale o nível máximo
+BROTLI_QUALITY = 11
+KEEP_VERSIONS = 3       # versões com hash mantidas no diretório (clientes com manifest antigo)
+
+SHARDS_INDEX = "index.json"
+SHARDS_DETAILS = "details"
+# o que a home (mapa de bolhas) usa: posição/tamanho, rótulo, título e imagem
+INDEX_FIELDS = ("id", "rank", "title", "label", "relevanceScore", "suggestedRadius", "imageUrl")
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """JSON em UTF-8 (sem escapar acentos); compacto, ou indentado com `pretty`."""
+    if ORJSON_AVAILABLE:
+        import orjson
+
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _timed(fn, *args) -> Any:
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1000.0
+
+
+def build_artifacts(doc: Any, out_dir: str, stem: str) -> List[Dict[str, Any]]:
+    """
+    Grava os artefatos de `doc` em `out_dir` e retorna um relatório por arquivo
+    (nome, bytes, ms de encode/compressão). O manifest é gravado por último.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    dumps(None)  # carrega o encoder (import do orjson) fora da medição
+    raw, encode_ms = _timed(dumps, doc)
+    digest = hashlib.sha256(raw).hexdigest()
+    base = f"{stem}.{digest[:HASH_LENGTH]}.json"
+
+    variants = [(base, raw, encode_ms)]
+    gz, gz_ms = _timed(lambda: gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0))
+    variants.append((base + ".gz", gz, gz_ms))
+    if BROTLI_AVAILABLE:
+        import brotli
+
+        br, br_ms = _timed(lambda: brotli.compress(raw, quality=BROTLI_QUALITY))
+        variants.append((base + ".br", br, br_ms))
+    else:
+        print("[WARN] brotli não instalado; artefato .br não gerado")
+
+    report: List[Dict[str, Any]] = []
+    for name, data, ms in variants:
+        write_atomic(os.path.join(out_dir, name), data)
+        report.append({"file": name, "bytes": len(data), "ms": round(ms, 2)})
+
+    manifest = {
+        "sha256": digest,
+        "json": base,
+        "gzip": base + ".gz",
+        "br": base + ".br" if BROTLI_AVAILABLE else None,
+        "bytes": {r["file"]: r["bytes"] for r in report},
+        "encoder": "orjson" if ORJSON_AVAILABLE else "json",
+    }
+    manifest_name = f"{stem}.manifest.json"
+    write_atomic(os.path.join(out_dir, manifest_name), dumps(manifest, pretty=True))
+
+    prune_artifacts(out_dir, stem, KEEP_VERSIONS)
+    return report
+
+
+def prune_artifacts(out_dir: str, stem: str, keep: int) -> None:
+    """Remove versões com hash além das `keep` mais recentes."""
+    pattern = re.compile(rf"^{re.escape(stem)}\.([0-9a-f]{{{HASH_LENGTH}}})\.json(\.gz|\.br)?$")
+    versions: Dict[str, float] = {}
+    for name in os.listdir(out_dir):
+        m = pattern.match(name)
+        if m:
+            mtime = os.path.getmtime(os.path.join(out_dir, name))
+            versions[m.group(1)] = max(versions.get(m.group(1), 0.0), mtime)
+    stale = sorted(versions, key=versions.get, reverse=True)[max(1, keep):]
+    for name in os.listdir(out_dir):
+        m = pattern.match(name)
+        if m and m.group(1) in stale:
+            os.remove(os.path.join(out_dir, name))
+
+
+def report_lines(report: List[Dict[str, Any]]) -> List[str]:
+    raw_bytes = report[0]["bytes"] if report else 0
+    lines = []
+    for r in report:
+        ratio = f" ({r['bytes'] / raw_bytes:.0%} do JSON)" if raw_bytes and r is not report[0] else ""
+        lines.append(f"🗜️  {r['file']}: {r['bytes']} bytes em {r['ms']:.2f} ms{ratio}")
+    return lines
+
+
+def detail_filename(bubble_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", str(bubble_id)) + ".json"
+
+
+def write_feed_shards(doc: Dict[str, Any], out_dir: str) -> Dict[str, int]:
+    """
+    Grava índice + detalhes de `doc` (documento do feed) em `out_dir`.
+    Ordem: detalhes, índice (atômico) e, por fim, remoção dos detalhes que saíram do
+    feed; quem lê o índice novo sempre encontra os detalhes. Retorna os bytes gravados.
+    """
+    details_dir = os.path.join(out_dir, SHARDS_DETAILS)
+    os.makedirs(details_dir, exist_ok=True)
+
+    index_items: List[Dict[str, Any]] = []
+    keep = set()
+    details_bytes = 0
+    for item in doc.get("items", []):
+        name = detail_filename(item.get("id", ""))
+        data = dumps(item)
+        write_atomic(os.path.join(details_dir, name), data)
+        details_bytes += len(data)
+        keep.add(name)
+        entry = {k: item.get(k) for k in INDEX_FIELDS}
+        entry["detail"] = f"{SHARDS_DETAILS}/{name}"
+        index_items.append(entry)
+
+    index = dumps({"generatedAt": doc.get("generatedAt"), "count": len(index_items), "items": index_items})
+    write_atomic(os.path.join(out_dir, SHARDS_INDEX), index)
+
+    for name in os.listdir(details_dir):
+        if name.endswith(".json") and name not in keep:
+            os.remove(os.path.join(details_dir, name))
+    return {"index": len(index), "details": details_bytes, "files": len(keep)}
@@ -0,0 +1,156 @@
+"""
+Feed incremental (delta) entre execuções consecutivas.
+
+Guarda o último feed publicado (snapshot + número de versão) num JSON local e, a
+cada execução, compara o feed novo com ele, por id da bolha:
+
+    {
+      "type": "delta", "version": N, "baseVersion": N-1, "generatedAt": ..., "count": ...,
+      "added":    [item completo, ...],
+      "removed":  [id, ...],
+      "reranked": {id: rank novo, ...},
+      "changed":  {id: {campo: valor novo, ...}, ...}     # campos ausentes vêm como null
+    }
+
+O cliente na versão N-1 aplica o delta (apply_delta) e chega ao feed N sem baixá-lo
+inteiro; em qualquer outra versão, baixa o feed completo (que também traz "version").
+
+Campos em "changed": qualquer campo do item que mudou, exceto os de score, que mudam
+a cada execução (o rawScore depende da hora):
+  - rawScore nunca entra em "changed": o cliente fica com o valor de quando a bolha
+    entrou (added) ou do último feed completo;
+  - relevanceScore e suggestedRadius só entram quando se afastam pelo menos
+    SCORE_QUANTUM do valor que o cliente tem, com o valor exato novo. Para isso o
+    snapshot guarda o feed como o cliente o vê (base + deltas aplicados), e o valor
+    no cliente fica sempre a menos de um degrau do feed completo.
+Quando não há snapshot anterior ou o delta passaria de `max_fraction` do tamanho do
+feed completo, o documento vira {"type": "snapshot", "version": N, "full": <arquivo>}.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from feed_artifacts import dumps, write_atomic
+
+VOLATILE_FIELDS = ("rawScore",)
+SCORE_QUANTUM = {"relevanceScore": 0.05, "suggestedRadius": 2.0}   # 0..1 e px
+
+
+def _by_id(doc: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {str(it["id"]): it for it in doc.get("items", []) if it.get("id") is not None}
+
+
+def _changed(field: str, old: Any, new: Any) -> bool:
+    quantum = SCORE_QUANTUM.get(field)
+    if quantum and isinstance(old, (int, float)) and isinstance(new, (int, float)):
+        return abs(new - old) >= quantum
+    return old != new
+
+
+def diff_feeds(prev: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """added / removed / reranked / changed de `prev` para `new` (por id)."""
+    old_items, new_items = _by_id(prev), _by_id(new)
+    added: List[Dict[str, Any]] = []
+    reranked: Dict[str, Any] = {}
+    changed: Dict[str, Dict[str, Any]] = {}
+    for bid, it in new_items.items():
+        before = old_items.get(bid)
+        if before is None:
+            added.append(it)
+            continue
+        if before.get("rank") != it.get("rank"):
+            reranked[bid] = it.get("rank")
+        fields = {
+            k: it.get(k)
+            for k in set(it) | set(before)
+            if k not in ("id", "rank") and k not in VOLATILE_FIELDS and _changed(k, before.get(k), it.get(k))
+        }
+        if fields:
+            changed[bid] = fields
+    removed = [bid for bid in old_items if bid not in new_items]
+    return {"added": added, "removed": removed, "reranked": reranked, "changed": changed}
+
+
+def apply_delta(prev: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Referência do lado do cliente: feed da versão baseVersion + delta → feed da versão nova."""
+    items = {bid: dict(it) for bid, it in _by_id(prev).items()}
+    for bid in delta.get("removed", []):
+        items.pop(bid, None)
+    for bid, rank in delta.get("reranked", {}).items():
+        items[bid]["rank"] = rank
+    for bid, fields in delta.get("changed", {}).items():
+        items[bid].update(fields)
+    for it in delta.get("added", []):
+        items[str(it["id"])] = dict(it)
+    ordered = sorted(items.values(), key=lambda x: x.get("rank", 0))
+    return {
+        "generatedAt": delta.get("generatedAt"),
+        "version": delta.get("version"),
+        "count": len(ordered),
+        "items": ordered,
+    }
+
+
+class FeedSnapshotStore:
+    def __init__(self, path: str, max_fraction: float = 0.5):
+        self.path = path
+        self.max_fraction = max_fraction
+        self.version = 0
+        self.feed: Optional[Dict[str, Any]] = None
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.version = int(data.get("version", 0))
+                self.feed = data.get("feed")
+            except Exception as e:
+                print(f"[WARN] Snapshot do feed ilegível ({path}): {e}")
+                self.version, self.feed = 0, None
+
+    @property
+    def next_version(self) -> int:
+        return self.version + 1
+
+    def build(self, doc: Dict[str, Any], full_name: str) -> Tuple[Dict[str, Any], int]:
+        """Documento de delta (ou de snapshot) para `doc`; retorna (documento, bytes do feed completo)."""
+        version = doc.get("version", self.next_version)
+        full_bytes = len(dumps(doc))
+        snapshot = {"type": "snapshot", "version": version, "generatedAt": doc.get("generatedAt"), "full": full_name}
+        if self.feed is None:
+            return dict(snapshot, reason="sem versão anterior"), full_bytes
+
+        delta = {
+            "type": "delta",
+            "version": version,
+            "baseVersion": self.version,
+            "generatedAt": doc.get("generatedAt"),
+            "count": doc.get("count", len(doc.get("items", []))),
+            **diff_feeds(self.feed, doc),
+        }
+        if len(dumps(delta)) > self.max_fraction * full_bytes:
+            return dict(snapshot, reason="delta maior que o limite"), full_bytes
+        return delta, full_bytes
+
+    def commit(self, doc: Dict[str, Any], delta: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Guarda o último feed publicado: com um `delta` do tipo "delta", a base do
+        próximo é o que o cliente terá (base atual + delta); senão, o próprio `doc`.
+        """
+        self.version = int(doc.get("version", self.next_version))
+        if delta is not None and delta.get("type") == "delta" and self.feed is not None:
+            doc = apply_delta(self.feed, delta)
+        self.feed = doc
+        write_atomic(self.path, dumps({"version": self.version, "feed": doc}))
+
+
+def stats_line(delta: Dict[str, Any], delta_bytes: int, full_bytes: int) -> str:
+    if delta.get("type") != "delta":
+        return f"🔀 Delta v{delta.get('version')}: snapshot completo ({delta.get('reason')})"
+    return (
+        f"🔀 Delta v{delta['baseVersion']}→v{delta['version']}: "
+        f"+{len(delta['added'])} -{len(delta['removed'])} "
+        f"rank={len(delta['reranked'])} alterados={len(delta['changed'])} "
+        f"({delta_bytes} de {full_bytes} bytes)"
+    )
@@ -0,0 +1,179 @@
+"""
+Cache HTTP em disco (SQLite) para o requests.Session, com requisições condicionais.
+
+- Dentro da janela de frescor (por tipo de endpoint) responde direto do disco.
+- Fora dela, revalida com If-None-Match / If-Modified-Since; um 304 reaproveita o corpo salvo.
+- Corpos são guardados comprimidos (zlib).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+from requests.adapters import HTTPAdapter
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+
+# headers que descrevem o corpo original (já decodificado pelo requests) não valem para o replay
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class CachingHTTPAdapter(HTTPAdapter):
+    def __init__(
+        self,
+        path: str,
+        freshness: Callable[[str], float],
+        max_stale_seconds: float = 2 * 24 * 3600,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.path = path
+        self.freshness = freshness
+        self.max_stale_seconds = max_stale_seconds
+
+        self.hits = 0             # servido do disco sem rede
+        self.revalidated = 0      # 304 (corpo reaproveitado)
+        self.misses = 0           # download completo
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("DELETE FROM http_cache WHERE fetched_at < ?", (time.time() - max_stale_seconds,))
+        self._db.commit()
+
+    @staticmethod
+    def _key(request: PreparedRequest) -> str:
+        return hashlib.sha256(f"{request.method} {request.url}".encode("utf-8")).hexdigest()
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, size, etag, last_modified, fetched_at FROM http_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "status": row[0],
+            "headers": json.loads(row[1]),
+            "body": row[2],
+            "size": row[3],
+            "etag": row[4],
+            "last_modified": row[5],
+            "fetched_at": row[6],
+        }
+
+    def _store(self, key: str, url: str, resp: Response) -> None:
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS}
+        content = resp.content or b""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(key, url, status, headers, body, size, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    url,
+                    resp.status_code,
+                    json.dumps(headers),
+                    zlib.compress(content, 6),
+                    len(content),
+                    resp.headers.get("ETag"),
+                    resp.headers.get("Last-Modified"),
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+
+    def _touch(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE http_cache SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+    @staticmethod
+    def _replay(request: PreparedRequest, entry: Dict[str, Any]) -> Response:
+        resp = Response()
+        resp.status_code = entry["status"]
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp._content = zlib.decompress(entry["body"])
+        resp.url = request.url or ""
+        resp.request = request
+        resp.reason = "OK"
+        resp.encoding = "utf-8"
+        return resp
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        url = request.url or ""
+        key = self._key(request)
+        entry = self._load(key)
+
+        if entry is not None and time.time() - entry["fetched_at"] <= self.freshness(url):
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += entry["size"]
+            return self._replay(request, entry)
+
+        if entry is not None:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = super().send(request, **kwargs)
+
+        if resp.status_code == 304 and entry is not None:
+            self._touch(key)
+            with self._lock:
+                self.revalidated += 1
+                self.bytes_saved += entry["size"]
+            return self._replay(request, entry)
+
+        if resp.status_code == 200:
+            self._store(key, url, resp)
+        with self._lock:
+            self.misses += 1
+            self.bytes_downloaded += len(resp.content or b"")
+        return resp
+
+    def reset_stats(self) -> None:
+        """Zera os contadores (o daemon chama no início de cada ciclo)."""
+        with self._lock:
+            self.hits = self.revalidated = self.misses = 0
+            self.bytes_saved = self.bytes_downloaded = 0
+
+    def stats_line(self) -> str:
+        total = self.hits + self.revalidated + self.misses
+        ratio = ((self.hits + self.revalidated) / total) if total else 0.0
+        return (
+            f"🌐 Cache HTTP: hits={self.hits} revalidados(304)={self.revalidated} misses={self.misses} "
+            f"({ratio:.0%} hit) | economizado={self.bytes_saved / 1024:.0f} KiB "
+            f"baixado={self.bytes_downloaded / 1024:.0f} KiB"
+        )
+
+    def close(self) -> None:
+        super().close()
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,149 @@
+"""
+Auditoria do tempo de import do engine (`python -X importtime`).
+
+Importa bubbles_engine num processo limpo e verifica:
+  - o tempo cumulativo do import fica abaixo do orçamento (ms);
+  - nenhuma dependência pesada (openai, requests, numpy, scipy, tiktoken,
+    sqlite3, asyncio) é carregada só por importar o módulo — elas entram
+    no primeiro uso (get_client(), get_session(), clusterização TF-IDF...);
+  - um enriquecimento contra um client falso, com o cache do LLM ligado (num
+    arquivo temporário), funciona e a segunda chamada sai do cache: pega nomes
+    que só existem sob TYPE_CHECKING e quebram em runtime.
+
+Sai com código 1 se algo estourar; serve como gate no CI.
+
+Uso:
+    python import_audit.py
+    python import_audit.py --budget-ms 150 --top 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import types
+from typing import Any, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_BUDGET_MS = 250.0  # ~65 ms medidos só com stdlib; folga para máquinas lentas de CI
+DEFAULT_MODULE = "bubbles_engine"
+DEFERRED_MODULES = ("openai", "requests", "numpy", "scipy", "tiktoken", "sqlite3", "asyncio")
+
+PROBE = (
+    "import json, sys; import {module}; "
+    "print(json.dumps(sorted(m for m in {deferred!r} if m in sys.modules)))"
+)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Linhas `import time: self | cumulative | name` → (nome, self µs, cumulativo µs)."""
+    rows: List[Tuple[str, int, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # cabeçalho
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def audit(module: str) -> Tuple[float, List[str], List[Tuple[str, int, int]]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, deferred=DEFERRED_MODULES)],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import de {module} falhou:\n{proc.stderr.strip()[-2000:]}")
+    rows = parse_importtime(proc.stderr)
+    total_us = next((cum for name, _, cum in rows if name == module), 0)
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    return total_us / 1000.0, loaded, rows
+
+
+class _FakeCompletions:
+    """chat.completions.create que devolve sempre o mesmo enriquecimento válido."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, **params: Any) -> Any:
+        self.calls += 1
+        content = json.dumps(
+            {
+                "title": "Título",
+                "label": "Rótulo",
+                "context": "Contexto.",
+                "opinions": [
+                    {"id": f"op{i}", "tone": tone, "text": "Opinião.", "source": "reddit"}
+                    for i, tone in enumerate(("positive", "negative", "neutral"), start=1)
+                ],
+            }
+        )
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def enrichment_smoke() -> List[str]:
+    """Enriquece um cluster 2x com o cache ligado; retorna os problemas encontrados."""
+    sys.path.insert(0, HERE)
+    import bubbles_engine as be
+
+    problems: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        be.LLM_CACHE_ENABLED = True
+        be.LLM_CACHE_FILE = os.path.join(tmp, "llm_cache.sqlite")
+        llm = _FakeCompletions()
+        comments = [{"text": "Comentário de teste com texto suficiente.", "score": 10}]
+        try:
+            first = be.generate_context_and_opinions("Título original", "worldnews", comments, llm=llm)
+            second = be.generate_context_and_opinions("Título original", "worldnews", comments, llm=llm)
+        except Exception as e:
+            return [f"enriquecimento falhou: {type(e).__name__}: {e}"]
+        finally:
+            be.close_clients()
+        if not first.get("label") or len(first.get("opinions") or []) != 3:
+            problems.append(f"enriquecimento incompleto: {first}")
+        if second != first or llm.calls != 1:
+            problems.append(f"cache do LLM não reaproveitou a resposta (chamadas={llm.calls})")
+    return problems
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Audita o tempo de import do engine")
+    ap.add_argument("--module", default=DEFAULT_MODULE)
+    ap.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    ap.add_argument("--top", type=int, default=10, help="mostra os N imports mais caros (cumulativo)")
+    ap.add_argument("--no-smoke", action="store_true", help="não roda o enriquecimento com client falso")
+    args = ap.parse_args()
+
+    total_ms, loaded, rows = audit(args.module)
+    print(f"⏱️  import {args.module}: {total_ms:.1f} ms (orçamento {args.budget_ms:.0f} ms)")
+    for name, _, cum in sorted(rows, key=lambda r: r[2], reverse=True)[1 : args.top + 1]:
+        print(f"   {cum / 1000.0:>8.1f} ms  {name}")
+
+    ok = True
+    if total_ms > args.budget_ms:
+        print(f"[WARN] Import acima do orçamento: {total_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        ok = False
+    if loaded:
+        print(f"[WARN] Dependências pesadas carregadas no import: {', '.join(loaded)}")
+        ok = False
+    if not args.no_smoke:
+        problems = enrichment_smoke()
+        for p in problems:
+            print(f"[WARN] Smoke do enriquecimento: {p}")
+        ok = ok and not problems
+    if ok:
+        print("✅ Import dentro do orçamento, sem dependências pesadas e enriquecimento (com cache) ok")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+"""
+Cache persistente (SQLite) para respostas do LLM, endereçado por conteúdo.
+
+A chave é o hash de (modelo, temperatura, system prompt, user prompt renderizado),
+então qualquer mudança no prompt gera uma nova entrada. Entradas expiram por TTL
+e, acima do limite de tamanho, as menos usadas recentemente são descartadas (LRU).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+
+class LLMCache:
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 24 * 3600,
+        max_entries: int = 5000,
+        max_bytes: int = 50 * 1024 * 1024,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, system_prompt: str, user_prompt: str) -> str:
+        payload = json.dumps(
+            [model, float(temperature), system_prompt, user_prompt],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, raw, len(raw.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        # 1) TTL
+        cur = self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self.evicted += max(0, cur.rowcount)
+
+        # 2) LRU por número de entradas e bytes
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM llm_cache ORDER BY last_access ASC"
+        ).fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            self.evicted += 1
+
+    def reset_stats(self) -> None:
+        """Zera os contadores (o daemon chama no início de cada ciclo)."""
+        with self._lock:
+            self.hits = self.misses = self.evicted = 0
+
+    def stats_line(self) -> str:
+        total = self.hits + self.misses
+        ratio = (self.hits / total) if total else 0.0
+        return f"🗄️  Cache LLM: hits={self.hits} misses={self.misses} ({ratio:.0%} hit) evicted={self.evicted}"
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,202 @@
+"""
+Instrumentação da execução: spans de tempo por etapa e por chamada externa.
+
+- `stage(nome)`: tempo total de parede de uma etapa do pipeline (fetch, cluster, llm...);
+  com `exclude`, desconta uma etapa aninhada (o dedupe feito durante o fetch).
+- `call(nome)` / `@timed(nome)`: latência de cada chamada externa (uma amostra por chamada),
+  com contagem de erros.
+- `incr(nome)`: contadores de eventos da execução (ex.: respostas do LLM reparadas).
+- `set_value(nome, chave, valor)`: valor por item (ex.: tokens do prompt de cada cluster).
+
+No fim da execução, `write_json` grava um resumo (totais por etapa, p50/p95 por tipo de
+chamada) e `write_prometheus` grava o mesmo no formato do textfile collector do
+node_exporter. Ambos escrevem num arquivo temporário e renomeiam (escrita atômica).
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil com interpolação linear (q em [0, 1])."""
+    if not values:
+        return 0.0
+    vals = sorted(values)
+    pos = (len(vals) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(vals) - 1)
+    return vals[lo] + (vals[hi] - vals[lo]) * (pos - lo)
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    def __init__(self, prefix: str = "bubbles"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zera spans e contadores (nova execução no mesmo processo)."""
+        with self._lock:
+            self.started_at = time.time()
+            self._t0 = time.perf_counter()
+            self.stages: Dict[str, float] = {}
+            self.calls: Dict[str, List[float]] = {}
+            self.errors: Dict[str, int] = {}
+            self.counters: Dict[str, int] = {}
+            self.values: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_value(self, name: str, key: str, value: float) -> None:
+        with self._lock:
+            self.values.setdefault(name, {})[key] = value
+
+    @contextmanager
+    def stage(self, name: str, exclude: Optional[str] = None) -> Iterator[None]:
+        """
+        `exclude`: etapa medida dentro desta (ex.: dedupe durante o fetch); o tempo que
+        ela acumular no meio é descontado, para as etapas não se sobreporem no resumo.
+        """
+        t0 = time.perf_counter()
+        with self._lock:
+            inner0 = self.stages.get(exclude, 0.0) if exclude else 0.0
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                if exclude:
+                    elapsed = max(0.0, elapsed - (self.stages.get(exclude, 0.0) - inner0))
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def call(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.calls.setdefault(name, []).append(elapsed)
+                if failed:
+                    self.errors[name] = self.errors.get(name, 0) + 1
+
+    def timed(self, name: str) -> Callable[[F], F]:
+        def deco(fn: F) -> F:
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.call(name):
+                    return fn(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return deco
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = dict(self.stages)
+            calls = {k: list(v) for k, v in self.calls.items()}
+            errors = dict(self.errors)
+            counters = dict(self.counters)
+            values = {k: dict(v) for k, v in self.values.items()}
+        return {
+            "startedAt": self.started_at,
+            "durationSeconds": round(time.perf_counter() - self._t0, 6),
+            "stages": {k: round(v, 6) for k, v in stages.items()},
+            "calls": {
+                name: {
+                    "count": len(vals),
+                    "errors": errors.get(name, 0),
+                    "totalSeconds": round(sum(vals), 6),
+                    "p50": round(percentile(vals, 0.5), 6),
+                    "p95": round(percentile(vals, 0.95), 6),
+                    "max": round(max(vals), 6),
+                }
+                for name, vals in calls.items()
+            },
+            "counters": counters,
+            "values": values,
+        }
+
+    def write_json(self, path: str) -> None:
+        _write_atomic(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path: str) -> None:
+        s = self.summary()
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_run_duration_seconds Wall time of the whole run.",
+            f"# TYPE {p}_run_duration_seconds gauge",
+            f"{p}_run_duration_seconds {s['durationSeconds']}",
+            f"# HELP {p}_run_started_timestamp_seconds Unix time when the run started.",
+            f"# TYPE {p}_run_started_timestamp_seconds gauge",
+            f"{p}_run_started_timestamp_seconds {s['startedAt']:.3f}",
+            f"# HELP {p}_stage_seconds Total wall time per pipeline stage.",
+            f"# TYPE {p}_stage_seconds gauge",
+        ]
+        for name, secs in sorted(s["stages"].items()):
+            lines.append(f'{p}_stage_seconds{{stage="{_label(name)}"}} {secs}')
+
+        lines += [
+            f"# HELP {p}_call_latency_seconds Latency of external calls.",
+            f"# TYPE {p}_call_latency_seconds summary",
+        ]
+        for name, c in sorted(s["calls"].items()):
+            lbl = _label(name)
+            lines.append(f'{p}_call_latency_seconds{{call="{lbl}",quantile="0.5"}} {c["p50"]}')
+            lines.append(f'{p}_call_latency_seconds{{call="{lbl}",quantile="0.95"}} {c["p95"]}')
+            lines.append(f'{p}_call_latency_seconds_sum{{call="{lbl}"}} {c["totalSeconds"]}')
+            lines.append(f'{p}_call_latency_seconds_count{{call="{lbl}"}} {c["count"]}')
+
+        lines += [
+            f"# HELP {p}_call_errors Failed external calls in the run.",
+            f"# TYPE {p}_call_errors gauge",
+        ]
+        for name, c in sorted(s["calls"].items()):
+            lines.append(f'{p}_call_errors{{call="{_label(name)}"}} {c["errors"]}')
+
+        lines += [
+            f"# HELP {p}_events Events counted in the run.",
+            f"# TYPE {p}_events gauge",
+        ]
+        for name, n in sorted(s["counters"].items()):
+            lines.append(f'{p}_events{{event="{_label(name)}"}} {n}')
+
+        for name, per_key in sorted(s["values"].items()):
+            lines += [
+                f"# HELP {p}_{name} Per-item values of the run ({name}).",
+                f"# TYPE {p}_{name} gauge",
+            ]
+            for key, v in sorted(per_key.items()):
+                lines.append(f'{p}_{name}{{key="{_label(key)}"}} {v}')
+
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+    def stats_line(self) -> str:
+        s = self.summary()
+        parts = [f"{k}={v:.1f}s" for k, v in s["stages"].items()]
+        return f"⏱️  Etapas: {' '.join(parts) or '-'} (total {s['durationSeconds']:.1f}s)"
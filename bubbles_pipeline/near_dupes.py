@@ -0,0 +1,180 @@
+"""
+Detecção de quase-duplicatas (MinHash + LSH por bandas).
+
+Cada texto vira um conjunto de shingles de caracteres (sobre o texto normalizado),
+resumido numa assinatura MinHash de `num_perm` valores (uma única passada de hash). A assinatura é cortada em
+bandas; textos que coincidem inteiros em alguma banda caem no mesmo bucket e viram
+candidatos. Só os candidatos têm a similaridade de Jaccard estimada e comparada com
+o limiar, então cada inserção/consulta custa O(bandas + candidatos), não O(n).
+
+Com textos parecidos entre si (títulos de um mesmo molde) os buckets crescem com o
+corpus e os candidatos também; por isso cada bucket guarda no máximo `max_bucket`
+chaves (as mais antigas) e cada consulta compara no máximo `max_candidates`,
+começando pelos buckets menores (os mais específicos). Um texto cujo bucket lotou
+continua indexado pelas outras bandas. O custo por inserção fica limitado, ao preço
+de poder deixar passar uma quase-duplicata que só colidiria num bucket lotado.
+"""
+
+import hashlib
+import re
+from operator import eq
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+_ROTATION = 1 << 64  # separa valores emprestados por densificação dos valores próprios
+MAX_BUCKET = 64        # chaves por bucket (banda); None = sem limite
+MAX_CANDIDATES = 128   # assinaturas comparadas por consulta; None = sem limite
+
+
+def normalize_text(s: str) -> str:
+    s = (s or "").lower()
+    s = re.sub(r"[^\w\s]", " ", s)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def shingles(text: str, size: int) -> List[str]:
+    t = normalize_text(text)
+    if not t:
+        return []
+    if len(t) <= size:
+        return [t]
+    return list({t[i : i + size] for i in range(len(t) - size + 1)})
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Escolhe (bandas, linhas por banda) com bandas × linhas = num_perm cujo ponto de
+    inflexão da curva de LSH, (1/b)^(1/r), fica mais perto do limiar. Em empate,
+    prefere o ponto abaixo do limiar (menos falsos negativos; a verificação filtra o resto).
+    """
+    best: Optional[Tuple[float, int, int]] = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        knee = (1.0 / bands) ** (1.0 / rows)
+        cost = abs(knee - threshold) + (0.0 if knee <= threshold else 1e-6)
+        if best is None or cost < best[0]:
+            best = (cost, bands, rows)
+    assert best is not None
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        shingle_size: int = 5,
+        seed: int = 1,
+        max_bucket: Optional[int] = MAX_BUCKET,
+        max_candidates: Optional[int] = MAX_CANDIDATES,
+    ):
+        self.threshold = float(threshold)
+        self.num_perm = max(1, int(num_perm))
+        self.shingle_size = max(1, int(shingle_size))
+        self.bands, self.rows = choose_bands(self.num_perm, self.threshold)
+        self.max_bucket = max_bucket
+        self.max_candidates = max_candidates
+
+        self._key = str(seed).encode("utf-8")
+        self._buckets: List[Dict[Tuple[int, ...], List[Hashable]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, Tuple[int, ...]] = {}
+        self._order: Dict[Hashable, int] = {}
+        self._next_order = 0
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def largest_bucket(self) -> int:
+        return max((len(keys) for buckets in self._buckets for keys in buckets.values()), default=0)
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """
+        MinHash de uma permutação só (one permutation hashing): cada shingle é
+        hasheado uma vez e cai num dos `num_perm` compartimentos, que guardam o menor
+        valor. Compartimentos vazios copiam o próximo preenchido (densificação por
+        rotação). Custa O(shingles) em vez de O(shingles × num_perm).
+        """
+        k = self.num_perm
+        bins: List[Optional[int]] = [None] * k
+        for sh in shingles(text, self.shingle_size):
+            h = int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=8, key=self._key).digest(), "little")
+            j, v = h % k, h // k
+            cur = bins[j]
+            if cur is None or v < cur:
+                bins[j] = v
+        if all(v is None for v in bins):
+            return None
+
+        sig: List[int] = []
+        for j in range(k):
+            dist = 0
+            while bins[(j + dist) % k] is None:
+                dist += 1
+            sig.append(bins[(j + dist) % k] + dist * _ROTATION)
+        return tuple(sig)
+
+    def _bands_of(self, sig: Tuple[int, ...]):
+        r = self.rows
+        for i in range(self.bands):
+            yield i, sig[i * r : (i + 1) * r]
+
+    def similarity(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        # fração de posições iguais = estimativa de Jaccard entre os conjuntos de shingles
+        return sum(map(eq, a, b)) / self.num_perm
+
+    def _matches(self, sig: Tuple[int, ...]) -> Iterator[Hashable]:
+        """Candidatos (buckets menores primeiro, até max_candidates) com Jaccard estimado >= limiar."""
+        buckets = [self._buckets[i].get(band) for i, band in self._bands_of(sig)]
+        seen = set()
+        for keys in sorted((b for b in buckets if b), key=len):
+            for key in keys:
+                if key in seen:
+                    continue
+                if self.max_candidates is not None and len(seen) >= self.max_candidates:
+                    return
+                seen.add(key)
+                if self.similarity(sig, self._signatures[key]) >= self.threshold:
+                    yield key
+
+    def query_signature(self, sig: Tuple[int, ...]) -> Optional[Hashable]:
+        """Retorna a chave de um item já indexado com Jaccard estimado >= limiar (o mais antigo)."""
+        return min(self._matches(sig), key=self._order.__getitem__, default=None)
+
+    def insert_signature(self, key: Hashable, sig: Tuple[int, ...]) -> None:
+        if key in self._signatures:
+            return
+        self._signatures[key] = sig
+        self._order[key] = self._next_order
+        self._next_order += 1
+        for i, band in self._bands_of(sig):
+            keys = self._buckets[i].setdefault(band, [])
+            if self.max_bucket is None or len(keys) < self.max_bucket:
+                keys.append(key)
+
+    def remove(self, key: Hashable) -> None:
+        """Tira `key` do índice (assinatura e buckets); chave ausente é ignorada."""
+        sig = self._signatures.pop(key, None)
+        if sig is None:
+            return
+        del self._order[key]
+        for i, band in self._bands_of(sig):
+            keys = self._buckets[i].get(band)
+            if keys is not None and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del self._buckets[i][band]
+
+    def add_if_new(self, key: Hashable, text: str) -> bool:
+        """
+        Indexa `text` sob `key` se não houver quase-duplicata já indexada.
+        Retorna False quando é quase-duplicata (não indexa); textos sem shingles
+        não são comparáveis e contam como novos (sem indexar).
+        """
+        sig = self.signature(text)
+        if sig is None:
+            return True
+        if next(self._matches(sig), None) is not None:
+            return False  # basta uma: não precisa achar a mais antiga
+        self.insert_signature(key, sig)
+        return True
@@ -0,0 +1,84 @@
+"""
+Contagem de tokens para o orçamento do prompt.
+
+Usa o tokenizer do modelo via tiktoken quando disponível (dependência opcional);
+sem ele, estima ~4 caracteres por token. O engine usa o contador para encher o
+bloco de comentários por score até o orçamento de entrada e para registrar o
+tamanho de cada prompt realmente enviado.
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+CHARS_PER_TOKEN = 4            # estimativa sem tiktoken
+MESSAGE_OVERHEAD_TOKENS = 4    # tokens de formatação por mensagem de chat
+REPLY_PRIMING_TOKENS = 3       # tokens fixos que iniciam a resposta
+
+
+class TokenCounter:
+    def __init__(self, model: str):
+        self.model = model
+        self.encoding = None
+        try:
+            import tiktoken  # opcional e pesado: só no primeiro contador criado
+        except ImportError:
+            return
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("o200k_base")
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text or "", disallowed_special=()))
+        return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        text = text or ""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is None:
+            return text[: max_tokens * CHARS_PER_TOKEN]
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens])
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        return sum(self.count(m.get("content", "")) + MESSAGE_OVERHEAD_TOKENS for m in messages) + REPLY_PRIMING_TOKENS
+
+
+class PromptTokenStats:
+    """
+    Tokens de entrada de cada prompt enviado ao modelo (cache hits não entram).
+    A chave é o id do representante do cluster; um pacote é um prompt só, com os
+    ids dos clusters unidos por "+". Um cluster reenviado sozinho depois do pacote
+    ganha a própria entrada, mas conta uma vez em `clusters`.
+    """
+
+    def __init__(self):
+        self.per_prompt: Dict[str, int] = {}
+        self.cluster_ids: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def record(self, key: str, tokens: int, clusters: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            self.cluster_ids.update(clusters if clusters is not None else [key])
+            self.per_prompt[key] = tokens
+
+    def stats_line(self, exact: bool = True) -> str:
+        with self._lock:
+            vals = list(self.per_prompt.values())
+            clusters = len(self.cluster_ids)
+        if not vals:
+            return "🔢 Prompt: nenhum prompt enviado ao modelo"
+        kind = "tokens" if exact else "tokens (estimados)"
+        return (
+            f"🔢 Prompt: prompts={len(vals)} clusters={clusters} total={sum(vals)} {kind} "
+            f"média={sum(vals) / len(vals):.0f} máx={max(vals)}"
+        )
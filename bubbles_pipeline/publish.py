@@ -0,0 +1,62 @@
+"""
+Publicação do feed gerado: cópia atômica para destinos (com índice + detalhes por
+bolha ao lado, se pedido), artefatos pré-comprimidos com hash no nome
+(feed_artifacts) e/ou comando externo.
+
+Módulo leve de propósito (só stdlib): `bubbles_cli.py publish` não precisa carregar o engine.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+from typing import List, Optional
+
+from feed_artifacts import build_artifacts, report_lines, write_feed_shards
+
+
+def publish_feed(
+    src: str,
+    paths: List[str],
+    command: Optional[str] = None,
+    artifacts_dir: Optional[str] = None,
+    shards_dirname: Optional[str] = None,
+    delta_src: Optional[str] = None,
+) -> bool:
+    """
+    Copia `src` para cada destino, grava os artefatos (JSON compacto + .gz/.br + manifest)
+    em `artifacts_dir` e roda `command`. Com `shards_dirname`, grava também índice +
+    detalhes em <pasta do destino>/<shards_dirname>; com `delta_src`, copia o delta para a
+    mesma pasta depois do feed. Retorna False se o comando falhar.
+    """
+    doc = None
+    if artifacts_dir or shards_dirname:
+        with open(src, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+    if artifacts_dir:
+        stem = os.path.splitext(os.path.basename(src))[0]
+        for line in report_lines(build_artifacts(doc, artifacts_dir, stem)):
+            print(line)
+        print(f"📦 Artefatos em {artifacts_dir} ({stem}.manifest.json)")
+    for dest in paths:
+        # cópia + rename: o consumidor nunca lê um arquivo pela metade
+        tmp = dest + ".tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        print(f"📤 Feed publicado em {dest}")
+        if shards_dirname:
+            shards_dir = os.path.join(os.path.dirname(dest) or ".", shards_dirname)
+            written = write_feed_shards(doc, shards_dir)
+            print(f"🧩 Índice ({written['index']} bytes) + {written['files']} detalhes em {shards_dir}")
+        if delta_src:
+            # depois do feed: quem não consegue aplicar o delta já encontra a versão nova completa
+            delta_dest = os.path.join(os.path.dirname(dest) or ".", os.path.basename(delta_src))
+            shutil.copyfile(delta_src, delta_dest + ".tmp")
+            os.replace(delta_dest + ".tmp", delta_dest)
+            print(f"🔀 Delta publicado em {delta_dest}")
+    if command:
+        proc = subprocess.run(command, shell=True)
+        if proc.returncode != 0:
+            print(f"[WARN] Comando de publicação terminou com código {proc.returncode}")
+            return False
+    return True
@@ -0,0 +1,60 @@
+"""
+Top-K em streaming com memória limitada.
+
+Os itens chegam um a um (à medida que as páginas das listagens são coletadas) e só
+os `capacity` de maior score ficam guardados, num min-heap: cada inserção custa
+O(log K) e o item mais fraco sai quando chega um melhor. O mínimo e o máximo são
+acompanhados sobre TODOS os itens vistos, então a normalização min/max dos
+candidatos dá o mesmo resultado que a passada completa sobre o corpus.
+
+Empates de score são decididos pela ordem de chegada (o primeiro fica), como no
+sort estável sobre a lista completa.
+
+`push` devolve o item que ficou de fora (o candidato desalojado ou o próprio item
+recusado), para quem guarda estado por candidato (ex.: o dedupe) poder liberá-lo.
+"""
+
+import heapq
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class StreamingTopK(Generic[T]):
+    def __init__(self, capacity: int, score: Callable[[T], float]):
+        self.capacity = max(1, int(capacity))
+        self.score = score
+        # (score, -ordem de chegada, item): o topo do heap é o candidato mais fraco
+        self._heap: List[Tuple[float, int, T]] = []
+        self.seen = 0
+        self.dropped = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item: T) -> Optional[T]:
+        s = self.score(item)
+        seq = self.seen
+        self.seen += 1
+        if self.min is None or s < self.min:
+            self.min = s
+        if self.max is None or s > self.max:
+            self.max = s
+
+        entry = (s, -seq, item)
+        if len(self._heap) < self.capacity:
+            heapq.heappush(self._heap, entry)
+            return None
+        self.dropped += 1
+        if entry[:2] > self._heap[0][:2]:
+            return heapq.heapreplace(self._heap, entry)[2]
+        return item
+
+    def items(self) -> List[T]:
+        """Candidatos na ordem de chegada."""
+        return [e[2] for e in sorted(self._heap, key=lambda e: -e[1])]
+
+    def stats_line(self) -> str:
+        return f"🏁 Ranking: vistos={self.seen} candidatos={len(self._heap)} descartados={self.dropped}"
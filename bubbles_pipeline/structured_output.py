@@ -0,0 +1,187 @@
+"""
+Saída estruturada do enriquecimento: schema, validação por campo e reparo direcionado.
+
+`response_format` pede ao modelo JSON restrito ao schema do enriquecimento
+(structured outputs, strict). `validate_enrichment` diz quais campos vieram
+inválidos e por quê; `build_repair_messages` monta um pedido curto que reenvia só
+esses campos (com o erro de cada um e o título/contexto como referência), sem o
+bloco de comentários do prompt original. Se nem o JSON foi legível, o reparo
+reenvia o texto bruto para ser convertido ao schema.
+
+Contadores por execução (em Metrics): llm.responses, llm.parse_failures,
+llm.invalid, llm.repairs, llm.repaired, llm.placeholders e, à parte (um por pacote,
+fora de llm.responses), llm.pack_parse_failures.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+ENRICHMENT_FIELDS = ("title", "label", "context", "opinions")
+OPINION_TONES = ("positive", "negative", "neutral")
+REPAIR_MAX_RAW_CHARS = 4000     # texto bruto reenviado quando o JSON não foi legível
+
+OPINION_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "string"},
+        "tone": {"type": "string", "enum": list(OPINION_TONES)},
+        "text": {"type": "string"},
+        "source": {"type": "string"},
+    },
+    "required": ["id", "tone", "text", "source"],
+    "additionalProperties": False,
+}
+
+FIELD_SCHEMAS: Dict[str, Any] = {
+    "title": {"type": "string"},
+    "label": {"type": "string"},
+    "context": {"type": "string"},
+    "opinions": {"type": "array", "items": OPINION_SCHEMA, "minItems": 3, "maxItems": 3},
+}
+
+
+def object_schema(fields: Iterable[str], extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    props = dict(extra or {})
+    props.update({f: FIELD_SCHEMAS[f] for f in fields})
+    # strict: todas as propriedades obrigatórias e nenhuma além delas
+    return {"type": "object", "properties": props, "required": list(props), "additionalProperties": False}
+
+
+def response_format(fields: Iterable[str] = ENRICHMENT_FIELDS, packed: bool = False) -> Dict[str, Any]:
+    """
+    response_format (json_schema, strict) do chat completions. `packed`: a raiz
+    precisa ser um objeto, então o array do pacote vem em {"clusters": [...]}.
+    """
+    if packed:
+        item = object_schema(fields, extra={"cluster_id": {"type": "string"}})
+        schema = {
+            "type": "object",
+            "properties": {"clusters": {"type": "array", "items": item}},
+            "required": ["clusters"],
+            "additionalProperties": False,
+        }
+        name = "bubble_enrichment_pack"
+    else:
+        schema = object_schema(fields)
+        name = "bubble_enrichment"
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def _opinions_error(opinions: Any) -> Optional[str]:
+    if not isinstance(opinions, list):
+        return "ausente ou não é uma lista"
+    problems: List[str] = []
+    valid = 0
+    for n, op in enumerate(opinions, start=1):
+        if not isinstance(op, dict):
+            problems.append(f"#{n} não é um objeto")
+        elif op.get("tone") not in OPINION_TONES:
+            problems.append(f"#{n} com tone inválido ({op.get('tone')!r})")
+        elif not str(op.get("text") or "").strip():
+            problems.append(f"#{n} com texto vazio")
+        else:
+            valid += 1
+    if valid == 3 and len(opinions) == 3:
+        return None
+    detail = f"; {', '.join(problems)}" if problems else ""
+    return f"esperadas 3 opiniões (positive, negative, neutral) com texto; vieram {valid} válidas de {len(opinions)}{detail}"
+
+
+def validate_enrichment(data: Any) -> Dict[str, str]:
+    """Campos inválidos de um enriquecimento → motivo (vazio = válido)."""
+    if not isinstance(data, dict):
+        return {f: "ausente (resposta sem JSON válido)" for f in ENRICHMENT_FIELDS}
+    errors: Dict[str, str] = {}
+    if not isinstance(data.get("title", ""), str):
+        errors["title"] = "não é texto"
+    for f in ("label", "context"):
+        value = data.get(f)
+        if not isinstance(value, str) or not value.strip():
+            errors[f] = "ausente ou vazio"
+    opinions = _opinions_error(data.get("opinions"))
+    if opinions:
+        errors["opinions"] = opinions
+    return errors
+
+
+REPAIR_SYSTEM_PROMPT = (
+    "Você corrige respostas JSON de um app de notícias em português do Brasil. "
+    "Retorne APENAS JSON válido, sem markdown, com exatamente os campos pedidos."
+)
+
+REPAIR_STRUCTURE = """
+{
+  "title": "título curto em português",
+  "label": "rótulo de poucas palavras",
+  "context": "contexto factual em 2 a 4 frases",
+  "opinions": [
+    {"id": "op1", "tone": "positive", "text": "....", "source": "reddit"},
+    {"id": "op2", "tone": "negative", "text": "....", "source": "reddit"},
+    {"id": "op3", "tone": "neutral", "text": "....", "source": "reddit"}
+  ]
+}
+""".strip()
+
+
+def build_repair_messages(
+    data: Any,
+    errors: Dict[str, str],
+    title: str,
+    subreddit: str,
+    raw: Optional[str] = None,
+) -> List[Dict[str, str]]:
+    """
+    Pedido de reparo: só os campos de `errors`. Com `raw` (JSON ilegível), pede a
+    conversão do texto bruto; senão, mostra os valores inválidos e os campos válidos
+    (título/rótulo/contexto) como referência.
+    """
+    fields = [f for f in ENRICHMENT_FIELDS if f in errors]
+    problems = "\n".join(f"- {f}: {errors[f]}" for f in fields)
+    header = f'TEMA (título original): "{title}"\nSUBREDDIT: {subreddit}\n'
+
+    if raw is not None:
+        body = (
+            f"{header}\nA resposta abaixo deveria ser um JSON com esta estrutura:\n{REPAIR_STRUCTURE}\n\n"
+            f"RESPOSTA RECEBIDA:\n{raw[:REPAIR_MAX_RAW_CHARS]}\n\n"
+            "Converta-a para essa estrutura, mantendo o conteúdo; complete o que faltar a partir do próprio texto."
+        )
+    else:
+        reference = {
+            f: data.get(f)
+            for f in ("title", "label", "context")
+            if f not in errors and isinstance(data, dict) and data.get(f)
+        }
+        invalid = {f: data.get(f) for f in fields} if isinstance(data, dict) else {}
+        body = (
+            f"{header}\nREFERÊNCIA (campos válidos, não devolva):\n{json.dumps(reference, ensure_ascii=False)}\n\n"
+            f"CAMPOS INVÁLIDOS:\n{json.dumps(invalid, ensure_ascii=False)}\n\nPROBLEMAS:\n{problems}\n\n"
+            f"Retorne um objeto JSON só com os campos {', '.join(fields)}, corrigidos, "
+            f"no formato destes campos nesta estrutura:\n{REPAIR_STRUCTURE}"
+        )
+    return [{"role": "system", "content": REPAIR_SYSTEM_PROMPT}, {"role": "user", "content": body}]
+
+
+def merge_repair(data: Any, patch: Any, fields: Iterable[str]) -> Dict[str, Any]:
+    """`data` com os `fields` substituídos pelos do reparo (os demais ficam como estavam)."""
+    out = dict(data) if isinstance(data, dict) else {}
+    if isinstance(patch, dict):
+        out.update({f: patch[f] for f in fields if f in patch})
+    return out
+
+
+def stats_line(counters: Dict[str, int]) -> str:
+    responses = counters.get("llm.responses", 0)
+    packs = counters.get("llm.pack_parse_failures", 0)
+    pack_note = f" pacotes ilegíveis={packs}" if packs else ""
+    if not responses:
+        return f"🧾 Saída do LLM: nenhuma resposta validada{pack_note}"
+    repairs = counters.get("llm.repairs", 0)
+    repaired = counters.get("llm.repaired", 0)
+    parse_failures = counters.get("llm.parse_failures", 0)
+    return (
+        f"🧾 Saída do LLM: respostas={responses} "
+        f"JSON ilegível={parse_failures} ({parse_failures / responses:.0%}) "
+        f"inválidas={counters.get('llm.invalid', 0)} "
+        f"reparos={repaired}/{repairs} ok ({repaired / repairs if repairs else 0:.0%}) "
+        f"placeholders={counters.get('llm.placeholders', 0)}{pack_note}"
+    )
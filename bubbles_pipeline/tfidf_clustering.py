@@ -0,0 +1,111 @@
+"""
+Clusterização vetorizada por similaridade TF-IDF (NumPy/SciPy).
+
+Monta uma matriz esparsa TF-IDF (linhas normalizadas em L2) sobre os tokens de cada
+título e calcula a similaridade de cosseno em blocos de linhas, só contra as linhas
+seguintes (triângulo superior). Cada título entra no grupo do primeiro título
+(líder) com cosseno acima do limiar, como o primeiro cluster compatível da versão
+por keywords; sem líder compatível, ele abre um grupo. Ligar pares por componentes
+conexas encadeava metade do corpus num grupo só.
+
+Termos presentes em mais de `max_df` dos títulos são descartados: são os que
+tornam o produto esparso quase denso (todo par que os compartilha vira candidato)
+e pouco dizem sobre o assunto. Em corpora pequenos (até MAX_DF_MIN_DOCS títulos
+por termo) nada é descartado.
+
+NumPy e SciPy são opcionais: sem eles, `AVAILABLE` é False e o engine usa a
+clusterização por keywords. Só são importados quando a clusterização TF-IDF roda.
+"""
+
+from importlib.util import find_spec
+from typing import Callable, Dict, List, Sequence
+
+AVAILABLE = find_spec("numpy") is not None and find_spec("scipy") is not None
+
+MAX_DF_MIN_DOCS = 50   # um termo só é descartado por max_df se aparecer em mais títulos que isso
+
+
+def tfidf_matrix(docs: Sequence[Sequence[str]], max_df: float = 1.0):
+    """CSR (n_docs × vocab) com tf binário, idf suavizado e linhas em norma L2."""
+    import numpy as np
+    from scipy import sparse
+
+    n = len(docs)
+    counts: Dict[str, int] = {}
+    for tokens in docs:
+        for t in set(tokens):
+            counts[t] = counts.get(t, 0) + 1
+    limit = max(max_df * n, MAX_DF_MIN_DOCS)
+
+    vocab: Dict[str, int] = {}
+    indptr = [0]
+    indices: List[int] = []
+    for tokens in docs:
+        cols = {vocab.setdefault(t, len(vocab)) for t in tokens if counts[t] <= limit}
+        indices.extend(sorted(cols))
+        indptr.append(len(indices))
+
+    indices_arr = np.asarray(indices, dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.float32)
+    df = np.bincount(indices_arr, minlength=len(vocab)).astype(np.float32)
+    idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+    data *= idf[indices_arr]
+
+    m = sparse.csr_matrix(
+        (data, indices_arr, np.asarray(indptr, dtype=np.int64)),
+        shape=(n, max(1, len(vocab))),
+    )
+    norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(m).tocsr()
+
+
+def assign_leaders(m, threshold: float, block_size: int = 2048):
+    """
+    Líder de cada linha: a primeira linha anterior (ou ela mesma) que virou líder e
+    tem cosseno >= threshold com ela. Processado bloco a bloco, em ordem.
+    """
+    import numpy as np
+
+    n = m.shape[0]
+    mt = m.T.tocsc()
+    leader = np.full(n, -1, dtype=np.int64)
+    for start in range(0, n, max(1, block_size)):
+        stop = min(n, start + block_size)
+        # só colunas >= start: as anteriores já têm líder
+        sims = m[start:stop].dot(mt[:, start:]).tocsr()
+        sims.data[sims.data < threshold] = 0
+        sims.eliminate_zeros()
+        for r in range(stop - start):
+            i = start + r
+            if leader[i] >= 0:
+                continue
+            leader[i] = i
+            cols = sims.indices[sims.indptr[r] : sims.indptr[r + 1]] + start
+            cols = cols[cols > i]
+            leader[cols[leader[cols] < 0]] = i
+    return leader
+
+
+def cluster_titles(
+    titles: Sequence[str],
+    tokenize: Callable[[str], List[str]],
+    threshold: float = 0.35,
+    block_size: int = 2048,
+    max_df: float = 0.1,
+) -> List[List[int]]:
+    """
+    Agrupa os títulos por similaridade de cosseno TF-IDF com o líder do grupo.
+    Retorna listas de índices; grupos ordenados pelo primeiro título (o líder) e,
+    dentro de cada grupo, índices em ordem crescente (mesma ordem da entrada).
+    """
+    if not AVAILABLE:
+        raise RuntimeError("clusterização TF-IDF requer numpy e scipy")
+    if not titles:
+        return []
+
+    m = tfidf_matrix([tokenize(t) for t in titles], max_df)
+    groups: Dict[int, List[int]] = {}
+    for i, lead in enumerate(assign_leaders(m, threshold, block_size).tolist()):
+        groups.setdefault(lead, []).append(i)
+    return list(groups.values())